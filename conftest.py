@@ -0,0 +1,20 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption('--stress', action='store_true',
+                     help='also run the tests marked `stress` (slow, large corpora)')
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'stress: builds a large synthetic site; run with --stress')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--stress'):
+        return
+    skip = pytest.mark.skip(reason='stress test: run with --stress')
+    for item in items:
+        if 'stress' in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,277 @@
+"""Benchmarks of the tableize plugin over synthetic Pelican sites.
+
+Run them with `invoke bench`; the suite is not collected by a plain `pytest`
+run.  Each corpus is a generated site of N articles x M tables x R rows x C
+columns, mixing separators and `ai`/`th` settings.  Besides the build time
+measured by pytest-benchmark, every benchmark records in its `extra_info`
+the time spent in each plugin signal handler and the plugin's counters (as
+collected in `tableize.tp_stats`), the peak memory of a build and the size of
+the output, all of which end up in the saved JSON results.
+
+An extra corpus can be given as `TABLEIZE_BENCH_CORPUS=NxMxRxC`.
+"""
+from datetime import date, timedelta
+import os
+import random
+import shutil
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from pelican import Pelican
+from pelican.contents import Article
+from pelican.settings import read_settings
+
+from . import tableize
+
+pytest.importorskip('pytest_benchmark')
+
+# name: (articles, tables per article, rows per table, columns per table)
+CORPORA = {
+    'no-tables': (200, 0, 0, 0),
+    'small-tables': (50, 4, 20, 4),
+    'large-tables': (4, 1, 5000, 6),
+}
+if os.environ.get('TABLEIZE_BENCH_CORPUS'):
+    CORPORA['custom'] = tuple(
+        int(size) for size in os.environ['TABLEIZE_BENCH_CORPUS'].split('x'))
+
+SEPARATORS = ('|', ',', ';')
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'yes', 'no', 'n/a', '1.0.2', '42')
+
+
+def make_table(rng, rows, columns, separator, ai, th):
+    """Return the source of one <tableize> block."""
+    lines = ['<tableize separator="{0}" ai="{1}" th="{2}" caption="Table">'.format(
+        separator, ai, th)]
+    if th:
+        lines.append(separator.join('head %d' % column for column in range(columns)))
+    for _row in range(rows):
+        lines.append(separator.join(rng.choice(WORDS) for _column in range(columns)))
+    lines.append('</tableize>')
+    return '\n'.join(lines)
+
+
+def make_article(rng, number, tables, rows, columns):
+    """Return the Markdown source of one synthetic article."""
+    parts = ['Title: Article {0}\nDate: {1}\nCategory: bench\n'.format(
+        number, date(2024, 1, 1) + timedelta(days=number % 365))]
+    parts.append('Some introductory text for article {0}.'.format(number))
+    for table in range(tables):
+        parts.append(make_table(rng, rows, columns,
+                                SEPARATORS[(number + table) % len(SEPARATORS)],
+                                ai=table % 2, th=(number + table) % 2))
+        parts.append('Text after table {0}.'.format(table))
+    return '\n\n'.join(parts) + '\n'
+
+
+def make_corpus(path, articles, tables, rows, columns, seed=0):
+    """Write a synthetic site's content into `path`/content; return that path."""
+    rng = random.Random(seed)
+    content_path = os.path.join(path, 'content')
+    os.makedirs(content_path, exist_ok=True)
+    for number in range(articles):
+        with open(os.path.join(content_path, 'article-%05d.md' % number), 'w',
+                  encoding='utf-8') as handle:
+            handle.write(make_article(rng, number, tables, rows, columns))
+    return content_path
+
+
+def site_settings(path, **plugin_settings):
+    """Return Pelican settings building the site under `path`."""
+    return read_settings(override={
+        'PATH': os.path.join(path, 'content'),
+        'OUTPUT_PATH': os.path.join(path, 'output'),
+        'CACHE_PATH': os.path.join(path, 'cache'),
+        'PLUGINS': [],
+        'SITEURL': 'https://example.com',
+        'TIMEZONE': 'UTC',
+        'FEED_ALL_ATOM': None,
+        'CATEGORY_FEED_ATOM': None,
+        'TRANSLATION_FEED_ATOM': None,
+        'AUTHOR_FEED_ATOM': None,
+        'AUTHOR_FEED_RSS': None,
+        tableize.PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME: plugin_settings,
+    })
+
+
+def build_site(settings):
+    """Build the site from scratch; return the total size of its output."""
+    shutil.rmtree(settings['OUTPUT_PATH'], ignore_errors=True)
+    Pelican(settings).run()
+    output_size = 0
+    for directory, _directories, files in os.walk(settings['OUTPUT_PATH']):
+        output_size += sum(os.path.getsize(os.path.join(directory, name))
+                           for name in files)
+    return output_size
+
+
+def peak_memory(function, *args):
+    """Return the peak memory allocated while running `function`."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture(scope='module', params=sorted(CORPORA))
+def corpus(request, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp(request.param))
+    make_corpus(path, *CORPORA[request.param])
+    return request.param, path
+
+
+@pytest.fixture(scope='module')
+def registered():
+    # register() is idempotent: its handlers stay connected for the session
+    tableize.register()
+
+
+def test_bench_build(benchmark, corpus, registered):
+    name, path = corpus
+    settings = site_settings(path)
+    handler_seconds = {}
+
+    def build():
+        output_size = build_site(settings)
+        # tp_stats only covers the latest build: accumulate across rounds
+        for handler, seconds in tableize.tp_stats.handler_seconds.items():
+            handler_seconds[handler] = handler_seconds.get(handler, 0.0) + seconds
+        return output_size
+
+    rounds = 3
+    output_size = benchmark.pedantic(build, rounds=rounds, iterations=1)
+    benchmark.extra_info.update(
+        corpus=name,
+        shape='x'.join(str(size) for size in CORPORA[name]),
+        handler_seconds={handler: seconds / rounds
+                         for handler, seconds in handler_seconds.items()},
+        counters={counter: value for counter, value in tableize.tp_stats.as_dict().items()
+                  if isinstance(value, int)},
+        peak_memory_bytes=peak_memory(build_site, settings),
+        output_bytes=output_size,
+    )
+
+
+class BenchArticle(Article):
+    """An Article carrying just what tp_content_object_init() looks at, so
+    that only the plugin is measured."""
+
+    def __init__(self, content, settings, source_path):
+        self._content = content
+        self.settings = settings
+        self.metadata = {}
+        self.source_path = source_path
+
+
+def rendered_contents(articles, tables, rows, columns):
+    """Return the synthetic articles' bodies as Markdown would hand them over:
+    every paragraph, including the <tableize> blocks, inside <p>...</p>."""
+    rng = random.Random(0)
+    contents = []
+    for number in range(articles):
+        paragraphs = make_article(rng, number, tables, rows, columns).split('\n\n')[1:]
+        contents.append('\n'.join('<p>%s</p>' % paragraph.strip()
+                                   for paragraph in paragraphs))
+    return contents
+
+
+def test_bench_content_object_init(benchmark, corpus):
+    name, path = corpus
+    settings = site_settings(path)
+    tableize.tableize_pelican_initialized_all(SimpleNamespace(settings=settings))
+    contents = rendered_contents(*CORPORA[name])
+    source_path = os.path.join(settings['PATH'], 'article.md')
+
+    def tableize_all():
+        output_size = 0
+        for content in contents:
+            article = BenchArticle(content, settings, source_path)
+            tableize.tp_content_object_init(article)
+            output_size += len(article._content)
+        return output_size
+
+    output_size = benchmark(tableize_all)
+    benchmark.extra_info.update(
+        corpus=name,
+        shape='x'.join(str(size) for size in CORPORA[name]),
+        peak_memory_bytes=peak_memory(tableize_all),
+        input_bytes=sum(len(content) for content in contents),
+        output_bytes=output_size,
+    )
+
+
+def throughput(benchmark, amount):
+    """Return `amount` per second of the benchmark's mean round, or None when
+    nothing was timed (e.g., under `--benchmark-disable`)."""
+    mean = getattr(getattr(benchmark.stats, 'stats', None), 'mean', None)
+    return amount / mean if mean else None
+
+
+@pytest.mark.parametrize('paragraphs', [10, 1000, 100000])
+def test_bench_prefilter(benchmark, tmp_path, paragraphs):
+    # cost of tp_content_object_init() on a table-free article, which the
+    # substring prefilter turns away before any parsing
+    make_corpus(str(tmp_path), 0, 0, 0, 0)
+    settings = site_settings(str(tmp_path))
+    tableize.tableize_pelican_initialized_all(SimpleNamespace(settings=settings))
+    content = '\n'.join('<p>Paragraph {0} of a table-free article, with <em>some</em> '
+                        'markup &amp; entities.</p>'.format(number)
+                        for number in range(paragraphs))
+    article = BenchArticle(content, settings, 'article.md')
+    benchmark(tableize.tp_content_object_init, article)
+    assert article._content is content
+    benchmark.extra_info.update(
+        input_bytes=len(content),
+        bytes_per_second=throughput(benchmark, len(content)),
+    )
+
+
+@pytest.fixture(scope='module')
+def huge_table_rows():
+    rng = random.Random(0)
+    return [tableize.Row(rng.choice(WORDS) for _column in range(6))
+            for _row in range(100000)]
+
+
+@pytest.mark.parametrize('engine', [tableize.TABLEIZE_ENGINE_JINJA,
+                                    tableize.TABLEIZE_ENGINE_FAST])
+def test_bench_engine(benchmark, huge_table_rows, engine):
+    # a 100k-row table through the default template, by each engine
+    template = tableize.tableize_config_template(tableize.TableizeConfig(engine=engine))
+    heads = ['head %d' % column for column in range(6)]
+    html = benchmark(tableize.tableize_render_table, template, heads, huge_table_rows,
+                     caption='Table', ai=1, th=1)
+    benchmark.extra_info.update(
+        engine=engine,
+        rows=len(huge_table_rows),
+        output_bytes=len(html),
+        rows_per_second=throughput(benchmark, len(huge_table_rows)),
+    )
+
+
+@pytest.mark.parametrize('splitter', ['csv', 'str.split'])
+def test_bench_split(benchmark, splitter):
+    # the 100k lines of an inline table body split into cells by `csv`, as
+    # tableize_iter_rows() does once the body has a quote in it, or by
+    # str.split(), as it does otherwise
+    rng = random.Random(0)
+    body = '\n'.join(' | '.join(rng.choice(WORDS) for _column in range(6))
+                     for _row in range(100000))
+    lines = list(tableize.tableize_iter_lines(body))
+    if splitter == 'csv':
+        def split():
+            return sum(1 for _cells in tableize.tableize_split_lines(
+                lines, '|', one_per_line=True))
+    else:
+        def split():
+            return sum(1 for line in lines if line.split('|'))
+    rows = benchmark(split)
+    benchmark.extra_info.update(
+        splitter=splitter,
+        rows=rows,
+        input_bytes=len(body),
+        rows_per_second=throughput(benchmark, rows),
+    )
@@ -28,11 +28,12 @@
 #            <tr class="tableize">
 #              {%- if ai == 1 %}
 #              <td class="tableize">{{ loop.index }}  </td>
-#              [%- endif %}
+#              {%- endif %}
 #              {%- for entry in body %}
 #              <td class="tableize">{{ entry }}</td>
-#              {%- endif %}
+#              {%- endfor %}
 #            </tr>
+#            {%- endfor %}
 #          </tbody>
 #        </table>
 #        </div>
@@ -55,15 +56,175 @@
 #          """
 #          }
 #
+#  Inside an article/page, a table is a pseudo-HTML `<tableize>` block whose
+#  lines are rows and whose cells are split on the separator; attributes on the
+#  opening tag override the plugin settings for that one table:
+#
+#      <tableize caption="Release matrix" th="1" ai="0" separator=",">
+#      Version, Released, Supported
+#      1.0, 2023, no
+#      2.0, 2024, yes
+#      </tableize>
+#
+#  Attribute values may not contain a literal '>' (write `&gt;` instead).
+#
+#  Instead of inline rows, a block may take its rows from a CSV/TSV data file,
+#  looked up relative to the article first, then to the content PATH:
+#
+#      <tableize src="data/releases.csv" separator="," th="1"></tableize>
+#
+#  Such files are memory-mapped and parsed lazily with the `csv` module, one
+#  row at a time straight into the template, and their cells are HTML-escaped.
+#  Write `separator="\t"` for tab-separated files.
+#
+#  When Pelican's CACHE_CONTENT is enabled, rendered tables are also kept in
+#  CACHE_PATH (content-addressed, size-bounded by `cache_size`) and reloaded on
+#  the next build when LOAD_CONTENT_CACHE is enabled, so unchanged tables are
+#  not rendered again.  The plugin also records there what the tables of each
+#  article depend on (template, settings, metadata overrides and `src` data
+#  files): when any of those changes, only the affected articles are dropped
+#  from Pelican's generator-level content cache and read again, including
+#  between the builds of `pelican --autoreload`.
+#
+#  Setting `workers` to 2 or more renders the tables of a whole generator at
+#  once on a pool of that many processes, after all its articles (or pages)
+#  are read and before any of them is finalized or written; the output is the
+#  same as with the default serial rendering.  Articles and pages feed one
+#  queue, drained once per generator, and once more when all generators are
+#  done for contents read by any other.
+#
+#  Tables with more than `stream_threshold` rows are rendered in streaming
+#  mode: rows are fed to the template as a generator and its output is
+#  written out in buffered chunks, so memory holds one row at a time rather
+#  than the whole table (0 disables streaming).  A custom template used on
+#  such tables must therefore go through `bodies` once, e.g. with a single
+#  `for` loop and without `bodies|length`.
+#
+#  Every signal handler is timed, and tables, rows, cells, characters in and
+#  out and cache hits are counted; a summary is logged at the end of the build
+#  and, when `stats_file` names a path, also written there as JSON.
+#
+#  Setting `profile` to a path runs every signal handler, and the rendering
+#  of tables during the Markdown parse, under cProfile for the whole build.
+#  At the end of the build, the profile is written to that path plus
+#  `.pstats` (for `python -m pstats` or snakeviz), and a report to that path
+#  plus `.txt`, listing the source files that took the plugin the longest.
+#  Setting `profile_allocations` to N also traces memory allocations with
+#  tracemalloc from start to end of the build, and lists the N source lines
+#  holding the most memory at the end, and the peak.  Tables rendered on the
+#  process pool (`workers`) are profiled as one batch per generator.
+#
+#  A whole article may also be a single table, written as a `.tbl` table
+#  source file: `Key: value` metadata lines, a blank line, then one row per
+#  line (parsed like a `src` data file, without Markdown):
 #
+#      Title: Release matrix
+#      Date: 2024-01-01
+#      tableize_caption: Release matrix
+#      tableize_separator: ,
+#      tableize_th: 1
 #
-from copy import copy
-import pprint
+#      Version, Released, Supported
+#      1.0, 2023, no
+#
+#  A single article may also override the template through its
+#  `tableize_template` metadata item; each distinct template source gets its
+#  own compiled entry in the plugin's template cache (see `template_cache_size`).
+#  Likewise, its `tableize_separator`, `tableize_ai` and `tableize_th`
+#  metadata items override those settings for all of its tables.
+#
+#  Markdown articles/pages get their tables rendered while Markdown parses
+#  them, by a Python-Markdown extension the plugin adds to MARKDOWN['extensions']
+#  (set `markdown` to False to turn it off): the table source is read as
+#  written, so smarty or HTML escaping never get in the way.  Blocks with a
+#  `src` data file, and the content of other readers, are still rendered
+#  after reading, as are all blocks when `markdown` is off.  So are they
+#  when `workers` renders them on a process pool, and when Pelican's
+#  CONTENT_CACHING_LAYER is 'reader' (its cache would otherwise keep tables
+#  of a former template), but the extension still keeps their source away
+#  from smarty and the like.
+#
+#  Tables using the default template are rendered by a dedicated string
+#  builder rather than by Jinja2, with the very same output; set `engine` to
+#  'jinja' to render them through Jinja2 anyway.  Other templates always go
+#  through Jinja2.
+#
+#  Setting `fragment_threshold` to a number of characters moves every table
+#  whose HTML is longer than that into a fragment file of its own, under
+#  `fragment_path` in the output directory, when its article (or page) is
+#  written.  It then holds a small stub with a link to the fragment, and a
+#  script loading it in place.  Fragment files are named after the hash of
+#  their HTML, so a table shared by several articles or translations is
+#  written once, and an unchanged one is not written again by the next
+#  build.  Feeds keep the whole tables.
+#
+#  Setting `minify` renders the default template without a class on every
+#  inner element and without whitespace between the tags; style such tables
+#  through their container instead, e.g. `div.tableize td { ... }`.
+#  Setting `precompress` to 'gz', 'br' or 'gz,br' also writes `.gz`/`.br`
+#  sidecar files (`.br` needs the `brotli` package) next to every article
+#  whose tables total at least `precompress_threshold` characters, and next
+#  to every fragment file that large, for web servers serving precompressed
+#  files (e.g., nginx's `gzip_static`).  The `.gz`/`.br` sidecars of every
+#  other article or page written are removed, since they would be stale.
+#
+#  Identical tables (same rows or data file, same template and settings) are
+#  rendered once per build: the HTML of the tables rendered so far is kept in
+#  memory, up to `memo_size` characters, least recently used first out, and
+#  reused for every further copy (0 disables that).
+#
+#  Setting `prefetch_workers` to 1 or more looks up and reads the `src` data
+#  files of a generator's articles (or pages) on a pool of that many threads,
+#  as soon as the generator starts reading them, instead of one file after the
+#  other as each one is rendered: worth it when the content lives on network
+#  storage, where every file access waits for a round trip.  Source files are
+#  scanned once more for that, those restored from Pelican's content cache
+#  excepted.  Only a few dozen data files, and 64 MiB of them, are held in
+#  memory ahead of the articles at any time.
+#
+#  Setting `inline_markdown` renders the inline Markdown of the cells of the
+#  tables of Markdown articles/pages (`[links](...)`, `code`, *emphasis*),
+#  which the tableize extension otherwise keeps as written.  Cells are
+#  rendered thousands at a time by a single Markdown instance, and the HTML
+#  of the last few thousand distinct cell texts is reused; smarty never gets
+#  to them.  Cells of `src` data files are left as they are.
+#
+#  The settings are checked and resolved once per build, when Pelican is
+#  initialized, into an immutable TableizeConfig kept in pelican.settings
+#  (as 'TABLEIZE_PLUGIN_CONFIG'); changing TABLEIZE_PLUGIN afterward has no
+#  effect on that build.  Only the signal handlers of the features those
+#  settings turn on are then connected, and the modules only some of them
+#  use (the process and thread pools, gzip, mmap) are imported on first use,
+#  keeping the plugin's share of the start-up of a small build low.
+#
+from collections import OrderedDict, namedtuple
+import csv
+import functools
+import hashlib
+from html import escape
+import io
+from itertools import chain
+import json
+import os
 import logging
+import re
+import sys
+import threading
+import time
+from jinja2 import Environment
+from jinja2.environment import TemplateStream
+try:
+    from markdown.blockprocessors import BlockProcessor
+    from markdown.extensions import Extension
+    from markdown.postprocessors import Postprocessor
+except ImportError:
+    # Markdown is optional to Pelican, and so to the tableize extension
+    BlockProcessor = Extension = Postprocessor = object
 from pelican import signals, logger
+from pelican.cache import FileDataCacher
 from pelican.readers import BaseReader
 from pelican.contents import Article, Page
-from pelican.settings import DEFAULT_CONFIG
+from . import __version__
 
 logger = logging.getLogger('added2ndname')  # log with my plugin name
 logger = logging.getLogger(__name__)  # log with my plugin name
@@ -80,12 +241,134 @@ PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_AI = 'ai'
 PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TH = 'th'
 PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_SEPARATOR = 'separator'
 PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TEMPLATE = 'template'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TEMPLATE_CACHE_SIZE = 'template_cache_size'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_CACHE_SIZE = 'cache_size'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_WORKERS = 'workers'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_STREAM_THRESHOLD = 'stream_threshold'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_STATS_FILE = 'stats_file'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MARKDOWN = 'markdown'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_ENGINE = 'engine'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_FRAGMENT_THRESHOLD = 'fragment_threshold'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_FRAGMENT_PATH = 'fragment_path'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MINIFY = 'minify'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS = 'precompress'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS_THRESHOLD = 'precompress_threshold'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MEMO_SIZE = 'memo_size'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PREFETCH_WORKERS = 'prefetch_workers'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_INLINE_MARKDOWN = 'inline_markdown'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PROFILE = 'profile'
+PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PROFILE_ALLOCATIONS = 'profile_allocations'
+
+# Pseudo-HTML tags delimiting a table block inside an article/page content
+TABLEIZE_OPEN_TAG = '<tableize'
+TABLEIZE_CLOSE_TAG = '</tableize>'
+
+# Table block attribute naming an external CSV/TSV data file
+TABLEIZE_ATTRIBUTE_SRC = 'src'
+
+# File extension of table source files (see TableizeReader), and the syntax
+# of their metadata lines
+TABLEIZE_READER_EXTENSION = 'tbl'
+TABLEIZE_READER_METADATA = re.compile(r'^([A-Za-z][\w-]*)\s*:(.*)$')
+
+# Name of the rendered-table cache file within Pelican's CACHE_PATH, and the
+# entry stamping the plugin version that wrote it
+TABLEIZE_CACHE_NAME = 'tableize'
+TABLEIZE_CACHE_VERSION_KEY = '__version__'
+
+# Name of the file, alongside, holding the dependencies of rendered articles
+TABLEIZE_DEPENDENCIES_NAME = 'tableize-dependencies'
+
+# Article/page metadata items overriding the settings of a single article
+# (and, for a table source file, giving the caption of its table)
+PELICAN_METADATA_TABLEIZE_TEMPLATE = 'tableize_template'
+PELICAN_METADATA_TABLEIZE_CAPTION = 'tableize_caption'
+PELICAN_METADATA_TABLEIZE_SEPARATOR = 'tableize_separator'
+PELICAN_METADATA_TABLEIZE_AI = 'tableize_ai'
+PELICAN_METADATA_TABLEIZE_TH = 'tableize_th'
+
+# Those metadata items, in the order of a TableizeConfig override tuple
+TABLEIZE_METADATA_OVERRIDES = (
+    PELICAN_METADATA_TABLEIZE_TEMPLATE,
+    PELICAN_METADATA_TABLEIZE_SEPARATOR,
+    PELICAN_METADATA_TABLEIZE_AI,
+    PELICAN_METADATA_TABLEIZE_TH,
+)
+
+# pelican.settings item holding the TableizeConfig of the current build
+PELICAN_CONFIG_PLUGIN_TABLEIZE_CONFIG_NAME = 'TABLEIZE_PLUGIN_CONFIG'
 
 #
 
 DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_SEPARATOR = '|'
 DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_AUTO_INDEX = 1
 DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TABLE_HEADER = False
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE_CACHE_SIZE = 16
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_CACHE_SIZE = 64 * 1024 * 1024
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_WORKERS = 0
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_STREAM_THRESHOLD = 10000
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_STATS_FILE = ''
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MARKDOWN = True
+
+# `engine` values: 'fast' renders the default template with
+# TableizeFastTemplate, 'jinja' always goes through Jinja2
+TABLEIZE_ENGINE_FAST = 'fast'
+TABLEIZE_ENGINE_JINJA = 'jinja'
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_ENGINE = TABLEIZE_ENGINE_FAST
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_FRAGMENT_THRESHOLD = 0
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_FRAGMENT_PATH = 'tableize'
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MINIFY = False
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PRECOMPRESS = ''
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PRECOMPRESS_THRESHOLD = 64 * 1024
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MEMO_SIZE = 16 * 1024 * 1024
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PREFETCH_WORKERS = 0
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_INLINE_MARKDOWN = False
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PROFILE = ''
+DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PROFILE_ALLOCATIONS = 0
+
+# `precompress` sidecar file extensions: gzip, and Brotli when the optional
+# `brotli` package is installed
+TABLEIZE_PRECOMPRESS_GZIP = 'gz'
+TABLEIZE_PRECOMPRESS_BROTLI = 'br'
+TABLEIZE_PRECOMPRESS_EXTENSIONS = (TABLEIZE_PRECOMPRESS_GZIP, TABLEIZE_PRECOMPRESS_BROTLI)
+
+# What an article gets in place of a table moved into a fragment file, and
+# the script, added once after its last stub, putting the fragments back
+TABLEIZE_FRAGMENT_STUB = (
+    '\n<div class="tableize-fragment" data-tableize-src="{url}">'
+    '<a href="{url}">Table ({size} KiB)</a></div>')
+TABLEIZE_FRAGMENT_LOADER = (
+    '\n<script>document.querySelectorAll("div.tableize-fragment[data-tableize-src]")'
+    '.forEach(function (stub) {fetch(stub.dataset.tableizeSrc)'
+    '.then(function (response) {return response.text();})'
+    '.then(function (html) {stub.outerHTML = html;});});</script>')
+
+# Largest data file kept in memory by TableizePrefetch; larger ones are only
+# looked up and stamped ahead, then read as usual
+TABLEIZE_PREFETCH_MAX_SIZE = 32 * 1024 * 1024
+
+# How far TableizePrefetch reads ahead of the articles: at most that many
+# data files, and about that many bytes, held in memory at any time
+TABLEIZE_PREFETCH_WINDOW_FILES = 64
+TABLEIZE_PREFETCH_WINDOW_SIZE = 64 * 1024 * 1024
+
+# What a separator longer than one character is swapped for, for `csv`
+TABLEIZE_SEPARATOR_STAND_IN = '\x1f'
+
+# Number of slowest source files listed by the `profile` report
+TABLEIZE_PROFILE_TOP = 20
+
+# Number of template output chunks gathered before each write in streaming mode
+TABLEIZE_STREAM_BUFFER_SIZE = 64
+
+# `inline_markdown`: distinct cell texts whose HTML is kept, the number of
+# cells rendered together, and what joins their HTML in between (cells
+# holding it are left as they are)
+TABLEIZE_INLINE_CACHE_SIZE = 4096
+TABLEIZE_INLINE_BATCH_CELLS = 4096
+TABLEIZE_INLINE_SEPARATOR = '\x0f'
+# cells without any of those characters have no inline Markdown to render
+TABLEIZE_INLINE_MARKUP = re.compile(r'[\\`*_\[<>&]')
 DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE = """
 <div class="tableize">
   <table class="tableize">
@@ -109,18 +392,88 @@ DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE = """
       <tr class="tableize">
         {%- if ai == 1 %}
         <td class="tableize">{{ loop.index }}  </td>
-        [%- endif %}
+        {%- endif %}
         {%- for entry in body %}
         <td class="tableize">{{ entry }}</td>
-        {%- endif %}
+        {%- endfor %}
       </tr>
+      {%- endfor %}
     </tbody>
   </table>
 </div>"""
 
-# Shouldn't we be putting global variables into reader.settings (aka Pelican config)?
-pp_tableize_initialized = False  # NOQA  # those value disappears at next call?
-pp_tableize_sanity_found = False  # NOQA  # those value disappears at next call?
+# DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE as used under `minify`: no
+# class on the inner elements, which a stylesheet reaches through the
+# container instead (`div.tableize td`), and no whitespace between the tags
+TABLEIZE_MINIFIED_TEMPLATE = (
+    '<div class="tableize"><table>'
+    '{%- if caption %}<caption>{{ caption }}</caption>{%- endif %}'
+    '{%- if th != 0 %}<thead><tr>'
+    '{%- if ai == 1 %}<th>No.</th>{%- endif %}'
+    '{%- for head in heads %}<th>{{ head }}</th>{%- endfor %}'
+    '</tr></thead>{%- endif %}'
+    '<tbody>'
+    '{%- for body in bodies %}<tr>'
+    '{%- if ai == 1 %}<td>{{ loop.index }}</td>{%- endif %}'
+    '{%- for entry in body %}<td>{{ entry }}</td>{%- endfor %}'
+    '</tr>{%- endfor %}'
+    '</tbody></table></div>')
+
+# Compiled Jinja2 templates, keyed by the SHA-1 of their template source.
+# Rendering from a string re-parses the template every time, so each template
+# source is compiled once and shared by every table that uses it.  Per-article
+# template overrides get their own entries; least recently used entries are
+# dropped once `template_cache_size` is exceeded.
+tp_jinja_env = Environment()
+tp_template_cache = OrderedDict()
+tp_template_cache_size = DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE_CACHE_SIZE
+
+# Rendered tables persisted across builds (a TableizeCache), or None when
+# Pelican's CACHE_CONTENT is off.
+tp_table_cache = None
+
+# Rendered tables of the current build (a TableizeMemo), or None when
+# `memo_size` is 0.
+tp_table_memo = None
+
+# Dependencies of the rendered articles/pages, persisted alongside (a
+# TableizeDependencies), or None when Pelican's CACHE_CONTENT is off.
+tp_dependencies = None
+
+# Articles/pages whose tables wait for tableize_render_pending() when
+# rendering on a process pool (`workers`), one TableizePending each.
+tp_pending_tables = []
+
+# Which articles contain tables, per ArticlesGenerator: a dict of source path
+# -> (start, end) offsets of every rendered table within the article's final
+# content.  tp_current_index is the one of the generator currently reading
+# its articles, None outside of that: Pelican creates every generator before
+# any of them reads, so it is set by the preread signals.
+tp_table_indexes = {}
+tp_current_index = None
+
+# `src` data files prefetched for the generator currently reading its
+# articles (a TableizePrefetch), or None when `prefetch_workers` is 0.
+tp_prefetch = None
+
+# Tables rendered by TableizeBlockProcessor while Markdown reads the current
+# article/page, as (start, end, stripped) within the Markdown output (see
+# TableizePostprocessor); tp_content_object_init() takes them over for the
+# table index of that article/page.
+tp_markdown_tables = []
+
+# Renders the inline Markdown of table cells (a TableizeInlineMarkdown), set
+# up in each process on first use
+tp_inline_markdown = None
+
+# Fragment files written (or found up to date) during the current build
+tp_written_fragments = set()
+
+# ArticlesGenerator lists whose articles go into its table index
+TABLEIZE_GENERATOR_CONTENT_LISTS = ('articles', 'translations', 'drafts',
+                                    'drafts_translations', 'hidden_articles',
+                                    'hidden_translations', 'pages', 'hidden_pages',
+                                    'draft_pages', 'draft_translations')
 
 
 def set_default_settings(settings):
@@ -136,98 +489,2089 @@ def set_default_settings(settings):
             PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_SEPARATOR:
                 DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_SEPARATOR,
             PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TEMPLATE:
-                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TEMPLATE_CACHE_SIZE:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE_CACHE_SIZE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_CACHE_SIZE:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_CACHE_SIZE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_WORKERS:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_WORKERS,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_STREAM_THRESHOLD:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_STREAM_THRESHOLD,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_STATS_FILE:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_STATS_FILE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MARKDOWN:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MARKDOWN,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_ENGINE:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_ENGINE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_FRAGMENT_THRESHOLD:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_FRAGMENT_THRESHOLD,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_FRAGMENT_PATH:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_FRAGMENT_PATH,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MINIFY:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MINIFY,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PRECOMPRESS,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS_THRESHOLD:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PRECOMPRESS_THRESHOLD,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MEMO_SIZE:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MEMO_SIZE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PREFETCH_WORKERS:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PREFETCH_WORKERS,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_INLINE_MARKDOWN:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_INLINE_MARKDOWN,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PROFILE:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PROFILE,
+            PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PROFILE_ALLOCATIONS:
+                DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PROFILE_ALLOCATIONS
         }
     )
 
 
+def tableize_template_hash(template_source):
+    """ Return the hex digest used as the template cache key. """
+    return hashlib.sha1(template_source.encode('utf-8')).hexdigest()
+
+
+def tableize_get_template(template_source, key=None):
+    """ Return the compiled Jinja2 template for `template_source`,
+        compiling it only on the first request (bounded LRU cache)."""
+    if key is None:
+        key = tableize_template_hash(template_source)
+    template = tp_template_cache.get(key)
+    if template is not None:
+        tp_template_cache.move_to_end(key)
+        return template
+    template = tp_jinja_env.from_string(template_source)
+    tp_template_cache[key] = template
+    while len(tp_template_cache) > tp_template_cache_size:
+        tp_template_cache.popitem(last=False)
+    return template
+
+
+# Pieces of the output of a template, as Jinja2 renders it, for
+# TableizeFastTemplate: everything but the caption, index and cell values.
+TableizeFastPieces = namedtuple('TableizeFastPieces', [
+    'table_open', 'caption_open', 'caption_close', 'thead_open', 'th_ai',
+    'th_open', 'th_close', 'thead_close', 'tbody_open', 'tr_open', 'td_open',
+    'td_ai_close', 'td_close', 'tr_close', 'table_close'])
+
+# those of DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE
+TABLEIZE_FAST_DEFAULT_PIECES = TableizeFastPieces(
+    table_open='\n<div class="tableize">\n  <table class="tableize">',
+    caption_open='\n    <caption> ',
+    caption_close=' </caption>',
+    thead_open='\n    <thead class="tableize">\n    <tr class="tableize">',
+    th_ai='\n      <th class="tableize"> No. </th>',
+    th_open='\n      <th class="tableize">',
+    th_close='</th>',
+    thead_close='\n    </tr>\n    </thead>',
+    tbody_open='\n    <tbody class="tableize">',
+    tr_open='\n      <tr class="tableize">',
+    td_open='\n        <td class="tableize">',
+    td_ai_close='  </td>',
+    td_close='</td>',
+    tr_close='\n      </tr>',
+    table_close='\n    </tbody>\n  </table>\n</div>')
+
+# those of TABLEIZE_MINIFIED_TEMPLATE
+TABLEIZE_FAST_MINIFIED_PIECES = TableizeFastPieces(
+    table_open='<div class="tableize"><table>',
+    caption_open='<caption>',
+    caption_close='</caption>',
+    thead_open='<thead><tr>',
+    th_ai='<th>No.</th>',
+    th_open='<th>',
+    th_close='</th>',
+    thead_close='</tr></thead>',
+    tbody_open='<tbody>',
+    tr_open='<tr>',
+    td_open='<td>',
+    td_ai_close='</td>',
+    td_close='</td>',
+    tr_close='</tr>',
+    table_close='</tbody></table></div>')
+
+
+def tableize_fast_cells(cells, cell_open, cell_close):
+    """ Return the HTML of a row's cells; non-str cells are converted with
+        str(), as Jinja2 does. """
+    if not cells:
+        return ''
+    separator = cell_close + cell_open
+    try:
+        return cell_open + separator.join(cells) + cell_close
+    except TypeError:
+        return cell_open + separator.join(map(str, cells)) + cell_close
+
+
+class TableizeFastTemplate:
+    """ Renderer of the default (or minified) template without Jinja2,
+        producing the very same output from its TableizeFastPieces.
+
+        Stands in for its compiled Jinja2 template (same render() and
+        stream() calls) under the 'fast' engine.  Each row is one string
+        built from the constant tag pieces, the `ai` branch being taken once
+        per table rather than once per row."""
+    __slots__ = ('pieces',)
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def generate(self, context):
+        """ Yield the output in chunks: the table head, then each row. """
+        pieces = self.pieces
+        caption = context.get('caption')
+        ai = context.get('ai')
+        head = [pieces.table_open]
+        if caption:
+            head.append(pieces.caption_open + str(caption) + pieces.caption_close)
+        if context.get('th') != 0:
+            head.append(pieces.thead_open)
+            if ai == 1:
+                head.append(pieces.th_ai)
+            head.append(tableize_fast_cells(context.get('heads') or (),
+                                            pieces.th_open, pieces.th_close))
+            head.append(pieces.thead_close)
+        head.append(pieces.tbody_open)
+        yield ''.join(head)
+
+        # the cells of a row: one join, with the closing and opening tags
+        # between them; the `ai` branch is taken once for the whole table
+        td_open, td_close = pieces.td_open, pieces.td_close
+        td_between = td_close + td_open
+        tr_open, tr_close = pieces.tr_open, pieces.tr_close
+        bodies = context.get('bodies') or ()
+        if ai == 1:
+            index_open = tr_open + td_open
+            index_close = pieces.td_ai_close
+            for index, body in enumerate(bodies, 1):
+                if not body:
+                    yield f'{index_open}{index}{index_close}{tr_close}'
+                    continue
+                try:
+                    joined = td_between.join(body)
+                except TypeError:
+                    joined = td_between.join(map(str, body))
+                yield f'{index_open}{index}{index_close}{td_open}{joined}{td_close}{tr_close}'
+        else:
+            for body in bodies:
+                if not body:
+                    yield tr_open + tr_close
+                    continue
+                try:
+                    joined = td_between.join(body)
+                except TypeError:
+                    joined = td_between.join(map(str, body))
+                yield f'{tr_open}{td_open}{joined}{td_close}{tr_close}'
+        yield pieces.table_close
+
+    def render(self, *args, **kwargs):
+        return ''.join(self.generate(dict(*args, **kwargs)))
+
+    def stream(self, *args, **kwargs):
+        return TemplateStream(self.generate(dict(*args, **kwargs)))
+
+
+# The default and minified templates' TableizeFastTemplate, by the template
+# cache key they stand in for
+tp_fast_template = TableizeFastTemplate(TABLEIZE_FAST_DEFAULT_PIECES)
+tp_fast_minified_template = TableizeFastTemplate(TABLEIZE_FAST_MINIFIED_PIECES)
+tp_fast_templates = {
+    tableize_template_hash(DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE):
+        tp_fast_template,
+    tableize_template_hash(TABLEIZE_MINIFIED_TEMPLATE): tp_fast_minified_template,
+}
+
+
+def tableize_config_template(config):
+    """ Return what renders the tables of a TableizeConfig: the fast
+        renderer for the default (or minified) template under the 'fast'
+        engine, its compiled Jinja2 template otherwise. """
+    if config.engine == TABLEIZE_ENGINE_FAST:
+        template = tp_fast_templates.get(config.template_hash)
+        if template is not None:
+            return template
+    return tableize_get_template(config.template_source, config.template_hash)
+
+
+def tableize_default_settings():
+    """ Return a new dict of the plugin's default settings. """
+    defaults = {}
+    set_default_settings(defaults)
+    return defaults[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME]
+
+
+def tableize_setting_flag(value):
+    """ Convert an `ai`/`th` setting or metadata value into 0/1. """
+    if isinstance(value, str):
+        return tableize_attribute_flag(value)
+    return 1 if value else 0
+
+
+# TableizeConfig constructor arguments, in order
+TABLEIZE_CONFIG_FIELDS = ('separator', 'ai', 'th', 'template_source',
+                          'template_cache_size', 'cache_size', 'workers',
+                          'stream_threshold', 'stats_file', 'markdown',
+                          'engine', 'fragment_threshold', 'fragment_path', 'minify',
+                          'precompress', 'precompress_threshold', 'memo_size',
+                          'prefetch_workers', 'inline_markdown', 'profile',
+                          'profile_allocations')
+
+# Override tuple of an article without any tableize metadata
+TABLEIZE_NO_OVERRIDES = (None,) * len(TABLEIZE_METADATA_OVERRIDES)
+
+
+class TableizeConfig:
+    """ The plugin settings of a build, checked and resolved once.
+
+        Instances are immutable, so a single one is shared by every article
+        of the build (and copied as-is into worker processes); per-article
+        metadata overrides are layered on with with_overrides()."""
+    __slots__ = TABLEIZE_CONFIG_FIELDS + ('template_hash', 'fingerprint', '_variants')
+
+    def __init__(self, separator=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_SEPARATOR,
+                 ai=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_AUTO_INDEX,
+                 th=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TABLE_HEADER,
+                 template_source=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE,
+                 template_cache_size=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE_CACHE_SIZE,
+                 cache_size=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_CACHE_SIZE,
+                 workers=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_WORKERS,
+                 stream_threshold=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_STREAM_THRESHOLD,
+                 stats_file=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_STATS_FILE,
+                 markdown=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MARKDOWN,
+                 engine=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_ENGINE,
+                 fragment_threshold=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_FRAGMENT_THRESHOLD,
+                 fragment_path=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_FRAGMENT_PATH,
+                 minify=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MINIFY,
+                 precompress=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PRECOMPRESS,
+                 precompress_threshold=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PRECOMPRESS_THRESHOLD,
+                 memo_size=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_MEMO_SIZE,
+                 prefetch_workers=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PREFETCH_WORKERS,
+                 inline_markdown=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_INLINE_MARKDOWN,
+                 profile=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PROFILE,
+                 profile_allocations=DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_PROFILE_ALLOCATIONS):
+        if minify and template_source == DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE:
+            template_source = TABLEIZE_MINIFIED_TEMPLATE
+        if isinstance(precompress, str):
+            # e.g., 'gz,br'
+            precompress = tuple(extension.strip().lstrip('.')
+                                for extension in precompress.split(',') if extension.strip())
+        set_field = object.__setattr__
+        set_field(self, 'separator', separator)
+        set_field(self, 'ai', tableize_setting_flag(ai))
+        set_field(self, 'th', tableize_setting_flag(th))
+        set_field(self, 'template_source', template_source)
+        set_field(self, 'template_cache_size', template_cache_size)
+        set_field(self, 'cache_size', cache_size)
+        set_field(self, 'workers', workers)
+        set_field(self, 'stream_threshold', stream_threshold)
+        set_field(self, 'stats_file', stats_file)
+        set_field(self, 'markdown', markdown)
+        set_field(self, 'engine', engine)
+        set_field(self, 'fragment_threshold', fragment_threshold)
+        set_field(self, 'fragment_path', fragment_path)
+        set_field(self, 'minify', minify)
+        set_field(self, 'precompress', tuple(precompress))
+        set_field(self, 'precompress_threshold', precompress_threshold)
+        set_field(self, 'memo_size', memo_size)
+        set_field(self, 'prefetch_workers', prefetch_workers)
+        set_field(self, 'inline_markdown', inline_markdown)
+        set_field(self, 'profile', profile)
+        set_field(self, 'profile_allocations', profile_allocations)
+        set_field(self, 'template_hash', tableize_template_hash(template_source))
+        # identifies everything here that goes into the rendered HTML
+        set_field(self, 'fingerprint', tableize_table_hash(
+            '', self.template_hash, separator, self.ai, self.th, None,
+            inline_markdown))
+        # with_overrides() results, by override tuple
+        set_field(self, '_variants', {})
+
+    @classmethod
+    def from_settings(cls, settings):
+        """ Resolve the plugin settings found in a pelican.settings dict. """
+        tableize_settings = tableize_default_settings()
+        tableize_settings.update(settings.get(PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME) or {})
+        return cls(
+            separator=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_SEPARATOR],
+            ai=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_AI],
+            th=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TH],
+            template_source=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TEMPLATE],
+            template_cache_size=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TEMPLATE_CACHE_SIZE],
+            cache_size=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_CACHE_SIZE],
+            workers=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_WORKERS],
+            stream_threshold=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_STREAM_THRESHOLD],
+            stats_file=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_STATS_FILE],
+            markdown=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MARKDOWN],
+            engine=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_ENGINE],
+            fragment_threshold=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_FRAGMENT_THRESHOLD],
+            fragment_path=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_FRAGMENT_PATH],
+            minify=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MINIFY],
+            precompress=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS],
+            precompress_threshold=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS_THRESHOLD],
+            memo_size=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_MEMO_SIZE],
+            prefetch_workers=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PREFETCH_WORKERS],
+            inline_markdown=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_INLINE_MARKDOWN],
+            profile=tableize_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PROFILE],
+            profile_allocations=tableize_settings[
+                PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PROFILE_ALLOCATIONS])
+
+    def with_overrides(self, overrides):
+        """ Return this config with an article's metadata `overrides` applied,
+            a tuple of values in TABLEIZE_METADATA_OVERRIDES order where an
+            empty value keeps the build setting.  Memoized by that tuple."""
+        if overrides == TABLEIZE_NO_OVERRIDES:
+            return self
+        config = self._variants.get(overrides)
+        if config is None:
+            template_source, separator, ai, th = overrides
+            fields = {name: getattr(self, name) for name in TABLEIZE_CONFIG_FIELDS}
+            if template_source:
+                fields['template_source'] = template_source
+            if separator:
+                fields['separator'] = separator
+            if ai:
+                fields['ai'] = ai
+            if th:
+                fields['th'] = th
+            config = self._variants[overrides] = TableizeConfig(**fields)
+        return config
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TableizeConfig is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('TableizeConfig is immutable')
+
+    def __reduce__(self):
+        # pickled (to worker processes, into Pelican's content cache) by its
+        # constructor arguments only, without the memoized variants
+        return (TableizeConfig,
+                tuple(getattr(self, name) for name in TABLEIZE_CONFIG_FIELDS))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def tableize_config(settings):
+    """ Return the TableizeConfig of a pelican.settings dict, resolving it
+        on first use when tableize_pelican_initialized_all() did not."""
+    config = settings.get(PELICAN_CONFIG_PLUGIN_TABLEIZE_CONFIG_NAME)
+    if config is None:
+        config = TableizeConfig.from_settings(settings)
+        settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_CONFIG_NAME] = config
+    return config
+
+
+def tableize_metadata_overrides(metadata):
+    """ Return the override tuple of an article/page metadata dict. """
+    return tuple(metadata.get(key) for key in TABLEIZE_METADATA_OVERRIDES)
+
+
+def tableize_content_overrides(content_class):
+    """ Return the metadata override tuple of an article/page. """
+    return tableize_metadata_overrides(content_class.metadata)
+
+
+def tableize_content_config(content_class):
+    """ Return the TableizeConfig of an article/page, with its metadata
+        overrides. """
+    return tableize_config(content_class.settings).with_overrides(
+        tableize_content_overrides(content_class))
+
+
+def tableize_content_template_source(content_class):
+    """ Return the template source of an article/page, honoring its
+        `tableize_template` metadata override."""
+    return tableize_content_config(content_class).template_source
+
+
+def tableize_content_template(content_class):
+    """ Return the compiled template for an article/page. """
+    return tableize_config_template(tableize_content_config(content_class))
+
+
+class Row(tuple):
+    """ The cells of one table row: a plain tuple of str, with no per-row
+        __dict__, so millions of them cost no more than bare tuples."""
+    __slots__ = ()
+
+
+class Table:
+    """ One table as handed to the template.
+
+        `heads` is a Row of interned header strings (the same few headers
+        recur across a whole site), `bodies` a list of Row, or an iterator of
+        Row when the table is streamed."""
+    __slots__ = ('caption', 'heads', 'bodies', 'ai', 'th')
+
+    def __init__(self, heads=(), bodies=(), caption=None, ai=1, th=False):
+        self.heads = Row(map(sys.intern, heads))
+        self.bodies = bodies
+        self.caption = caption
+        self.ai = ai
+        self.th = th
+
+    def context(self):
+        """ Return the template variables of this table. """
+        return {'caption': self.caption, 'heads': self.heads,
+                'bodies': self.bodies, 'ai': self.ai, 'th': self.th}
+
+    def render(self, template):
+        """ Render through an already compiled template. """
+        return template.render(self.context())
+
+    def stream(self, template, output=None):
+        """ Render through an already compiled template, writing its output
+            in buffered chunks to the `output` file object; without one, the
+            HTML is gathered and returned as a string."""
+        stream = template.stream(self.context())
+        stream.enable_buffering(TABLEIZE_STREAM_BUFFER_SIZE)
+        if output is not None:
+            stream.dump(output)
+            return None
+        output = io.StringIO()
+        stream.dump(output)
+        return output.getvalue()
+
+
+def tableize_render_table(template, heads, bodies, caption=None, ai=1, th=False):
+    """ Render one table through an already compiled template. """
+    return Table(heads, bodies, caption, ai, th).render(template)
+
+
+def tableize_stream_table(template, heads, bodies, caption=None, ai=1, th=False,
+                          output=None):
+    """ Render one table from an iterator of rows, see Table.stream(). """
+    return Table(heads, bodies, caption, ai, th).stream(template, output)
+
+
+# A table block found in the content: `start`/`end` delimit the text being
+# replaced, `attributes` holds the opening tag's attributes, and `body` is the
+# raw text between the opening and closing tags.
+TableSpan = namedtuple('TableSpan', ['start', 'end', 'attributes', 'body'])
+
+# The tables of one article/page, collected for rendering on a process pool.
+TableizePending = namedtuple('TableizePending', [
+    'content_class', 'content', 'spans', 'config', 'base_dirs', 'index',
+    'markdown_offsets', 'inline'])
+
+# Attribute quoting accepted on the opening tag: plain quotes, plus the
+# entities that smarty (and HTML escaping) substitute for them.
+TABLEIZE_ATTRIBUTE_QUOTES = (
+    ('"', '&ldquo;', '&rdquo;', '&#8220;', '&#8221;', '&quot;'),
+    ("'", '&lsquo;', '&rsquo;', '&#8216;', '&#8217;', '&#39;'),
+)
+# a bare attribute (`<tableize th>`) counts as set, as in HTML
+TABLEIZE_FLAG_TRUE = ('', '1', 'true', 'yes', 'on')
+
+
+def tableize_parse_attributes(text):
+    """ Parse `name="value"` pairs of an opening tag in a single pass.
+        Values may use any of TABLEIZE_ATTRIBUTE_QUOTES or be unquoted."""
+    attributes = {}
+    i = 0
+    n = len(text)
+    while i < n:
+        while i < n and text[i].isspace():
+            i += 1
+        if i >= n:
+            break
+        name_start = i
+        while i < n and text[i] != '=' and not text[i].isspace():
+            i += 1
+        name = text[name_start:i].lower()
+        while i < n and text[i].isspace():
+            i += 1
+        if i >= n or text[i] != '=':
+            attributes[name] = ''
+            continue
+        i += 1
+        while i < n and text[i].isspace():
+            i += 1
+        for family in TABLEIZE_ATTRIBUTE_QUOTES:
+            quote = next((q for q in family if text.startswith(q, i)), None)
+            if quote is not None:
+                break
+        if quote is None:
+            value_start = i
+            while i < n and not text[i].isspace():
+                i += 1
+            attributes[name] = text[value_start:i]
+            continue
+        # the value ends at the nearest member of the opening quote's family
+        i += len(quote)
+        value_start = i
+        closer = None
+        while i < n:
+            if text[i] in '"\'&':
+                closer = next((q for q in family if text.startswith(q, i)), None)
+                if closer is not None:
+                    break
+            i += 1
+        attributes[name] = text[value_start:i]
+        if closer is not None:
+            i += len(closer)
+    return attributes
+
+
+def tableize_iter_tables(content):
+    """ Lazily yield a TableSpan for every table block of `content`.
+
+        A single forward pass built on str.find(): the search position only
+        moves forward, and an unterminated tag ends the scan (nothing after it
+        could terminate it either), so malformed markup costs O(n) at worst."""
+    find = content.find
+    startswith = content.startswith
+    open_len = len(TABLEIZE_OPEN_TAG)
+    close_len = len(TABLEIZE_CLOSE_TAG)
+    pos = 0
+    while True:
+        start = find(TABLEIZE_OPEN_TAG, pos)
+        if start < 0:
+            return
+        attr_start = start + open_len
+        # skip look-alike tags such as <tableized>
+        if attr_start < len(content) and not (content[attr_start] == '>' or
+                                              content[attr_start].isspace()):
+            pos = attr_start
+            continue
+        attr_end = find('>', attr_start)
+        if attr_end < 0:
+            return
+        close = find(TABLEIZE_CLOSE_TAG, attr_end + 1)
+        if close < 0:
+            return
+        end = close + close_len
+        attributes = tableize_parse_attributes(content[attr_start:attr_end])
+        body = content[attr_end + 1:close]
+        # Markdown wraps the inline pseudo-tag in a paragraph; replace the
+        # paragraph as well rather than leaving a <div> inside a <p>.
+        if start >= 3 and startswith('<p>', start - 3) and startswith('</p>', end):
+            start -= 3
+            end += 4
+        yield TableSpan(start, end, attributes, body)
+        pos = end
+
+
+@functools.lru_cache(maxsize=None)
+def tableize_csv_dialect(separator):
+    """ Return the csv.Dialect splitting table rows on the one-character
+        `separator`: a cell may be quoted to hold the separator, with ""
+        for a quote, and blanks after a separator are skipped so that a
+        quote may follow it (`a | "b | c"`), unless the separator is one."""
+    class TableizeDialect(csv.Dialect):
+        delimiter = separator
+        quotechar = '"'
+        doublequote = True
+        skipinitialspace = separator not in ' \t'
+        lineterminator = '\n'
+        quoting = csv.QUOTE_MINIMAL
+        strict = False
+    return TableizeDialect
+
+
+class TableizeLineFeed:
+    """ The input of a `csv` reader fed one line at a time: it runs dry
+        after each line, which ends a quoted cell left open there. """
+    __slots__ = ('line',)
+
+    def __init__(self):
+        self.line = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.line
+        if line is None:
+            raise StopIteration
+        self.line = None
+        return line
+
+
+def tableize_split_each_line(lines, dialect):
+    """ Lazily yield the cells (a list of str) of every line of `lines`, as
+        one record each, split by a single `csv` reader in `dialect`."""
+    feed = TableizeLineFeed()
+    reader = csv.reader(feed, dialect)
+    for line in lines:
+        feed.line = line
+        try:
+            yield next(reader, [])
+        except csv.Error:
+            # e.g., a stray carriage return: split as is
+            feed.line = None
+            yield line.split(dialect.delimiter)
+
+
+def tableize_split_lines(lines, separator, one_per_line=False):
+    """ Return an iterator of the cells (a list of str) of every record of
+        `lines` through the C `csv` reader, in tableize_csv_dialect(); a
+        quoted cell may span lines, unless `one_per_line`.  A longer
+        separator is swapped for TABLEIZE_SEPARATOR_STAND_IN first, and a
+        quote, which `csv` cannot take, is split on instead."""
+    if separator == '"':
+        return (line.rstrip('\r\n').split(separator) for line in lines)
+    stand_in = None
+    if len(separator) > 1:
+        stand_in = TABLEIZE_SEPARATOR_STAND_IN
+        lines = (line.replace(separator, stand_in) for line in lines)
+    dialect = tableize_csv_dialect(stand_in or separator)
+    if one_per_line:
+        records = tableize_split_each_line(lines, dialect)
+    else:
+        records = csv.reader(lines, dialect)
+    if stand_in is None:
+        return records
+    # the separators quoted in a cell are given back
+    return ([cell.replace(stand_in, separator) for cell in cells] for cells in records)
+
+
+def tableize_iter_lines(body):
+    """ Lazily yield every non-blank line of a table body, stripped. """
+    find = body.find
+    pos = 0
+    n = len(body)
+    while pos < n:
+        eol = find('\n', pos)
+        if eol < 0:
+            eol = n
+        line = body[pos:eol].strip()
+        pos = eol + 1
+        # paragraph tags left behind when Markdown saw a blank line in the body
+        if line.startswith('<p>'):
+            line = line[3:].lstrip()
+        if line.endswith('</p>'):
+            line = line[:-4].rstrip()
+        if line:
+            yield line
+
+
+def tableize_iter_rows(body, separator):
+    """ Lazily yield the cells (a Row) of every non-blank line of a table
+        body, split on `separator` by tableize_split_lines(): one row per
+        line, whatever its quotes."""
+    lines = tableize_iter_lines(body)
+    if '"' in body:
+        records = tableize_split_lines(lines, separator, one_per_line=True)
+    else:
+        # nothing quoted: str.split() splits as `csv` would, only sooner
+        records = (line.split(separator) for line in lines)
+    for cells in records:
+        row = Row(cell.strip() for cell in cells)
+        tp_stats.rows += 1
+        tp_stats.cells += len(row)
+        yield row
+
+
+class TableizeInlineMarkdown:
+    """ Render the inline Markdown (links, code spans, emphasis...) of table
+        cells, many cells at a time.
+
+        One Markdown instance is kept, and reset() for every batch.  The
+        cells of a batch are the children of one element tree going through
+        Markdown's tree processors, so that no markup reaches from one cell
+        into the next; their HTML then goes through the postprocessors as a
+        single string.  The HTML of up to `max_size` distinct cell texts is
+        kept, least recently used first out, as the same few values ('yes',
+        'n/a', version numbers) fill most cells.  Neither block syntax nor
+        the site's Markdown extensions apply to cells: smarty in particular
+        leaves their quotes alone, as it does with the extension rendering
+        the tables."""
+    __slots__ = ('max_size', '_md', '_cells')
+
+    def __init__(self, max_size=TABLEIZE_INLINE_CACHE_SIZE):
+        from markdown import Markdown
+        self.max_size = max_size
+        self._md = Markdown(output_format='html')
+        self._cells = OrderedDict()
+
+    def convert(self, texts):
+        """ Return a list of the HTML of every cell text of `texts`. """
+        cells = self._cells
+        htmls = []
+        missing = {}
+        for text in texts:
+            html = cells.get(text)
+            if html is not None:
+                cells.move_to_end(text)
+            elif not TABLEIZE_INLINE_MARKUP.search(text) or \
+                    TABLEIZE_INLINE_SEPARATOR in text:
+                html = text
+            else:
+                missing[text] = None
+            htmls.append(html)
+        if not missing:
+            return htmls
+        rendered = dict(zip(missing, self.render(list(missing))))
+        cells.update(rendered)
+        while len(cells) > self.max_size:
+            cells.popitem(last=False)
+        return [rendered[text] if html is None else html
+                for text, html in zip(texts, htmls)]
+
+    def render(self, texts):
+        """ Return a list of the HTML of every cell text of `texts`, in one
+            pass of the Markdown instance. """
+        from xml.etree.ElementTree import Element, SubElement
+        md = self._md
+        md.reset()
+        root = Element('div')
+        for text in texts:
+            SubElement(root, 'span').text = text
+        for processor in md.treeprocessors:
+            new_root = processor.run(root)
+            if new_root is not None:
+                root = new_root
+        # each cell serializes as <span>...</span>
+        output = TABLEIZE_INLINE_SEPARATOR.join(
+            md.serializer(cell)[len('<span>'):-len('</span>')] for cell in root)
+        for processor in md.postprocessors:
+            output = processor.run(output)
+        return output.split(TABLEIZE_INLINE_SEPARATOR)
+
+    def iter_rows(self, rows):
+        """ Lazily yield every Row of `rows` with the inline Markdown of its
+            cells rendered, TABLEIZE_INLINE_BATCH_CELLS cells at a time. """
+        batch = []
+        size = 0
+        for row in rows:
+            batch.append(row)
+            size += len(row)
+            if size >= TABLEIZE_INLINE_BATCH_CELLS:
+                yield from self.convert_rows(batch)
+                batch = []
+                size = 0
+        if batch:
+            yield from self.convert_rows(batch)
+
+    def convert_rows(self, rows):
+        """ Return a list of `rows` with the inline Markdown of their cells
+            rendered. """
+        htmls = self.convert([cell for row in rows for cell in row])
+        converted = []
+        start = 0
+        for row in rows:
+            end = start + len(row)
+            converted.append(Row(htmls[start:end]))
+            start = end
+        return converted
+
+
+def tableize_inline_markdown():
+    """ Return the TableizeInlineMarkdown of this process. """
+    global tp_inline_markdown
+    if tp_inline_markdown is None:
+        tp_inline_markdown = TableizeInlineMarkdown()
+    return tp_inline_markdown
+
+
+def tableize_content_inline(content_class, config):
+    """ Tell whether the cells of an article/page's tables get their inline
+        Markdown rendered: under `inline_markdown`, for the Markdown sources
+        whose table blocks the tableize extension kept away from Markdown.
+        The cells of other Markdown sources went through Markdown (and
+        smarty, see tableize_pelican_find_smarty()) along with the rest. """
+    return bool(config.inline_markdown and config.markdown and Extension is not object
+                and content_class.metadata.get('reader') == 'markdown')
+
+
+def tableize_iter_record_rows(lines, separator):
+    """ Lazily yield the cells (a Row of HTML-escaped str) of every non-blank
+        CSV/TSV record found in an iterable of text `lines`.
+
+        Records are split by tableize_split_lines()."""
+    for cells in tableize_split_lines(lines, separator):
+        if not cells or (len(cells) == 1 and not cells[0].strip()):
+            continue
+        row = Row(escape(cell.strip(), quote=False) for cell in cells)
+        tp_stats.rows += 1
+        tp_stats.cells += len(row)
+        yield row
+
+
+def tableize_iter_file_rows(source_file, separator, encoding='utf-8'):
+    """ Lazily yield the cells (a Row of HTML-escaped str) of every record of
+        a CSV/TSV data file.
+
+        The file is memory-mapped and handed to the C `csv` reader one line
+        at a time, so no full-file string is ever built; a file prefetched
+        by TableizePrefetch is read from its bytes in memory instead."""
+    data = tp_prefetch.data(source_file) if tp_prefetch is not None else None
+    if data is not None:
+        lines = io.TextIOWrapper(io.BytesIO(data), encoding=encoding, newline='')
+        yield from tableize_iter_record_rows(lines, separator)
+        return
+    with open(source_file, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        import mmap
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            lines = (line.decode(encoding) for line in iter(data.readline, b''))
+            yield from tableize_iter_record_rows(lines, separator)
+
+
+def tableize_content_base_dirs(content_class):
+    """ Return the directories a `src` data file is looked up in: the
+        article's own directory, then the content PATH."""
+    return tableize_base_dirs(getattr(content_class, 'source_path', None),
+                              content_class.settings)
+
+
+def tableize_base_dirs(source_path, settings):
+    """ Return tableize_content_base_dirs() of a source file not read yet. """
+    base_dirs = []
+    if source_path and os.path.dirname(source_path):
+        base_dirs.append(os.path.dirname(source_path))
+    if settings.get('PATH'):
+        base_dirs.append(settings['PATH'])
+    return tuple(base_dirs)
+
+
+def tableize_find_source(src, base_dirs):
+    """ Return the path of data file `src`, or None when not found. """
+    for base_dir in base_dirs:
+        source_file = os.path.join(base_dir, src)
+        if os.path.isfile(source_file):
+            return source_file
+    return None
+
+
+def tableize_source_stamp(source_file):
+    """ Return what identifies a data file's content in a cache key. """
+    stamp = tp_prefetch.stamp(source_file) if tp_prefetch is not None else None
+    if stamp is not None:
+        return stamp
+    return tableize_stat_stamp(source_file, os.stat(source_file))
+
+
+def tableize_stat_stamp(source_file, stat):
+    """ Return tableize_source_stamp() from an os.stat() result. """
+    return '{0}\0{1}\0{2}'.format(os.path.abspath(source_file), stat.st_mtime_ns,
+                                   stat.st_size)
+
+
+def tableize_file_stamp(path):
+    """ Return tableize_source_stamp() of a file, or None if there is none. """
+    if not os.path.isfile(path):
+        return None
+    return tableize_source_stamp(path)
+
+
+def tableize_attribute_flag(value):
+    """ Convert a tag attribute value (e.g., "1", "true", "no") into 0/1. """
+    return 1 if value.strip().lower() in TABLEIZE_FLAG_TRUE else 0
+
+
+class TableizeCache(FileDataCacher):
+    """ Rendered tables kept in Pelican's CACHE_PATH between builds.
+
+        Entries map a tableize_table_hash() key to the rendered HTML, and
+        follow Pelican's own content cache: written only when CACHE_CONTENT
+        is enabled, loaded only when LOAD_CONTENT_CACHE is (so `pelican
+        --ignore-cache` works as usual), gzipped when GZIP_CACHE is.  The
+        least recently used entries are dropped at save time once the HTML
+        exceeds `max_size` characters, and a cache written by another
+        plugin version is discarded as a whole."""
+
+    def __init__(self, settings, max_size):
+        super().__init__(settings, TABLEIZE_CACHE_NAME,
+                         settings.get('CACHE_CONTENT', False),
+                         settings.get('LOAD_CONTENT_CACHE', False))
+        if self._cache.get(TABLEIZE_CACHE_VERSION_KEY) != __version__:
+            self._cache = {TABLEIZE_CACHE_VERSION_KEY: __version__}
+        self.max_size = max_size
+        self.size = sum(len(html) for key, html in self._cache.items()
+                        if key != TABLEIZE_CACHE_VERSION_KEY)
+        self.hits = 0
+        self.misses = 0
+
+    def cache_data(self, filename, data):
+        if self._cache_data_policy:
+            previous = self._cache.pop(filename, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._cache[filename] = data
+            self.size += len(data)
+
+    def get_cached_data(self, filename, default=None):
+        html = self._cache.pop(filename, None)
+        if html is None:
+            self.misses += 1
+            return default
+        # re-insert as the most recently used entry
+        self._cache[filename] = html
+        self.hits += 1
+        return html
+
+    def save_cache(self):
+        # dicts keep insertion order, so the oldest entries come first
+        for key in list(self._cache):
+            if self.size <= self.max_size:
+                break
+            if key != TABLEIZE_CACHE_VERSION_KEY:
+                self.size -= len(self._cache.pop(key))
+        super().save_cache()
+
+
+class TableizeMemo:
+    """ Rendered tables of the current build, kept in memory so that every
+        copy of a table is rendered once.
+
+        Entries map a tableize_table_hash() key to the rendered HTML; the
+        least recently used entries are dropped as soon as the HTML exceeds
+        `max_size` characters, and a table larger than that is not kept."""
+    __slots__ = ('max_size', 'size', 'hits', 'misses', '_tables')
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, key):
+        html = self._tables.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self._tables.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        if len(html) > self.max_size:
+            return
+        previous = self._tables.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._tables[key] = html
+        self.size += len(html)
+        while self.size > self.max_size:
+            self.size -= len(self._tables.popitem(last=False)[1])
+
+
+# What the tables of a rendered article/page depend on: its metadata
+# `overrides` tuple, the `fingerprint` of its effective TableizeConfig, and
+# the (path, stamp) `files` its `src` attributes were looked up in, the
+# stamp being None where no file was found.
+TableizeDependency = namedtuple('TableizeDependency', ['overrides', 'fingerprint', 'files'])
+
+
+class TableizeDependencies(FileDataCacher):
+    """ Dependency graph of the articles/pages with tables, kept in Pelican's
+        CACHE_PATH between builds: source path -> TableizeDependency.
+
+        Pelican's content cache only checks an article's own source file, so
+        it would keep serving tables rendered with a former template, setting
+        or data file.  stale_paths() tells which articles must be read again,
+        so that only those are dropped from that cache.
+        Follows the same CACHE_CONTENT/LOAD_CONTENT_CACHE policies as
+        TableizeCache."""
+
+    def __init__(self, settings):
+        super().__init__(settings, TABLEIZE_DEPENDENCIES_NAME,
+                         settings.get('CACHE_CONTENT', False),
+                         settings.get('LOAD_CONTENT_CACHE', False))
+        if self._cache.get(TABLEIZE_CACHE_VERSION_KEY) != __version__:
+            self._cache = {TABLEIZE_CACHE_VERSION_KEY: __version__}
+
+    def record(self, source_path, config, overrides, spans, base_dirs):
+        """ Record the dependencies of an article/page about to be rendered. """
+        files = []
+        for span in spans:
+            src = span.attributes.get(TABLEIZE_ATTRIBUTE_SRC)
+            if not src:
+                continue
+            # same lookup order as tableize_find_source(): a file appearing
+            # ahead of the one found also makes the article stale
+            for base_dir in base_dirs:
+                source_file = os.path.join(base_dir, src)
+                stamp = tableize_file_stamp(source_file)
+                files.append((source_file, stamp))
+                if stamp is not None:
+                    break
+        self.cache_data(source_path, TableizeDependency(
+            overrides, config.fingerprint, tuple(files)))
+
+    def is_stale(self, dependency, config):
+        """ Tell whether an article's tables would now render differently. """
+        if config.with_overrides(dependency.overrides).fingerprint != dependency.fingerprint:
+            return True
+        return any(tableize_file_stamp(path) != stamp for path, stamp in dependency.files)
+
+    def stale_paths(self, config):
+        """ Return the source paths of the articles/pages to render again. """
+        return [source_path for source_path, dependency in self._cache.items()
+                if source_path != TABLEIZE_CACHE_VERSION_KEY
+                and self.is_stale(dependency, config)]
+
+    def save_cache(self):
+        # forget the articles/pages deleted since
+        for source_path in list(self._cache):
+            if source_path != TABLEIZE_CACHE_VERSION_KEY \
+                    and not os.path.exists(source_path):
+                del self._cache[source_path]
+        super().save_cache()
+
+
+class TableizePrefetch:
+    """ The `src` data files of a generator's articles, looked up and read
+        on a pool of `workers` threads ahead of the articles themselves.
+
+        scan() queues an article source file, whose table blocks are then
+        searched for `src` attributes; each data file found is stamped and,
+        when `read_data`, read in full (up to TABLEIZE_PREFETCH_MAX_SIZE
+        bytes).  Source files are scanned in order, only as far ahead as
+        TABLEIZE_PREFETCH_WINDOW_FILES data files not handed over yet allow,
+        and no file is read past TABLEIZE_PREFETCH_WINDOW_SIZE bytes in
+        memory; data() hands a file over once, and release() drops one not
+        needed, each making room for more.  source(), stamp() and data()
+        wait for what they return if it is still on its way, and return None
+        for anything not prefetched, which is then accessed as usual."""
+
+    def __init__(self, generator, workers, read_data=True):
+        from concurrent.futures import ThreadPoolExecutor
+        self.generator = generator
+        self._read_data = read_data
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='tableize-prefetch')
+        self._lock = threading.Lock()
+        self._closed = False
+        # source files not scanned yet, and the futures of those that are
+        self._unscanned = []
+        self._next_scan = 0
+        self._scans = []
+        # (src, base_dirs) -> future of the data file path (or None)
+        self._sources = {}
+        # data file path -> future of its stamp
+        self._files = {}
+        # data file path -> bytes read, not handed over yet
+        self._data = {}
+        # data files being looked up, read or held in memory, and the bytes
+        # held: what the read-ahead window is measured by
+        self._held_files = 0
+        self._held_size = 0
+
+    def scan(self, filename, source_path, base_dirs):
+        """ Queue the article `filename` of the generator, found at
+            `source_path`, unless Pelican's content cache has it already. """
+        with self._lock:
+            self._unscanned.append((filename, source_path, base_dirs))
+            self._advance()
+
+    def _advance(self):
+        # with the lock held: scan on while the window has room
+        while not self._closed and self._next_scan < len(self._unscanned) and \
+                self._held_files < TABLEIZE_PREFETCH_WINDOW_FILES and \
+                self._held_size < TABLEIZE_PREFETCH_WINDOW_SIZE:
+            args = self._unscanned[self._next_scan]
+            self._unscanned[self._next_scan] = None
+            self._next_scan += 1
+            self._scans.append(self._executor.submit(self._scan, *args))
+            self._held_files += 1
+
+    def _scan(self, filename, source_path, base_dirs):
+        # a source file being scanned counts as a data file held, until the
+        # lookups of its data files count instead
+        try:
+            get_cached_data = getattr(self.generator, 'get_cached_data', None)
+            if get_cached_data is not None and \
+                    get_cached_data(filename, None) is not None:
+                return
+            try:
+                with open(source_path, encoding='utf-8', errors='replace') as handle:
+                    text = handle.read()
+            except OSError:
+                return
+            if TABLEIZE_OPEN_TAG not in text:
+                return
+            for span in tableize_iter_tables(text):
+                src = span.attributes.get(TABLEIZE_ATTRIBUTE_SRC)
+                if src:
+                    self._submit(self._sources, (src, base_dirs), self._find, src,
+                                 base_dirs)
+        finally:
+            self._drop(0)
+
+    def _find(self, src, base_dirs):
+        try:
+            source_file = tableize_find_source(src, base_dirs)
+            if source_file is not None:
+                self._submit(self._files, source_file, self._load, source_file)
+            return source_file
+        finally:
+            self._drop(0)
+
+    def _load(self, source_file):
+        # The bytes of the file are reserved in the window before it is
+        # read; once stamped, a file is held until data() hands it over,
+        # with its bytes or None when there was no room for them.
+        reserved = 0
+        try:
+            with open(source_file, 'rb') as handle:
+                stat = os.fstat(handle.fileno())
+                if not self._read_data:
+                    return tableize_stat_stamp(source_file, stat)
+                data = None
+                if self._reserve(stat.st_size):
+                    reserved = stat.st_size
+                    data = handle.read(reserved)
+                stamp = tableize_stat_stamp(source_file, stat)
+            with self._lock:
+                self._data[source_file] = data
+                self._held_size += (0 if data is None else len(data)) - reserved
+            reserved = None
+            return stamp
+        except OSError:
+            return None
+        finally:
+            if reserved is not None:
+                self._drop(reserved)
+
+    def _reserve(self, size):
+        with self._lock:
+            if size > TABLEIZE_PREFETCH_MAX_SIZE or \
+                    self._held_size + size > TABLEIZE_PREFETCH_WINDOW_SIZE:
+                return False
+            self._held_size += size
+            return True
+
+    def _submit(self, futures, key, function, *args):
+        # a data file looked up or read counts as held until _drop()
+        with self._lock:
+            if key not in futures:
+                futures[key] = self._executor.submit(function, *args)
+                self._held_files += 1
+
+    def _drop(self, size):
+        with self._lock:
+            self._held_files -= 1
+            self._held_size -= size
+            self._advance()
+
+    @staticmethod
+    def _wait(futures):
+        for future in futures:
+            exception = future.exception()
+            if exception is not None:
+                logger.warning('tableize: prefetching failed: %s', exception)
+
+    @staticmethod
+    def _result(future):
+        # a failed lookup or load leaves the file to the usual access
+        if future is None or future.exception() is not None:
+            return None
+        return future.result()
+
+    def source(self, src, base_dirs):
+        return self._result(self._sources.get((src, base_dirs)))
+
+    def stamp(self, source_file):
+        return self._result(self._files.get(source_file))
+
+    def data(self, source_file):
+        """ Return the bytes of a data file, and forget them. """
+        if self.stamp(source_file) is None:
+            return None
+        with self._lock:
+            if source_file not in self._data:
+                return None
+            data = self._data.pop(source_file)
+        self._drop(0 if data is None else len(data))
+        return data
+
+    def release(self, source_file):
+        """ Forget the bytes of a data file that turned out not needed. """
+        self.data(source_file)
+
+    def close(self):
+        """ Scan no further, wait for every file under way and stop the
+            threads; what was prefetched remains available. """
+        with self._lock:
+            self._closed = True
+        # scans queue lookups, which queue loads: wait for each stage in turn
+        try:
+            self._wait(self._scans)
+            with self._lock:
+                lookups = list(self._sources.values())
+            self._wait(lookups)
+        finally:
+            self._executor.shutdown(wait=True)
+        logger.debug('tableize: prefetched %d data files', len(self._files))
+
+
+def tableize_prefetch_close():
+    """ Stop prefetching, and forget the data files prefetched. """
+    global tp_prefetch
+    prefetch, tp_prefetch = tp_prefetch, None
+    if prefetch is not None:
+        prefetch.close()
+
+
+def tableize_prefetch_generator(generator, workers, paths, excludes):
+    """ Return a TableizePrefetch scanning the source files a generator is
+        about to read: those of its `paths` setting, less its `excludes`. """
+    settings = generator.settings
+    # worker processes (`workers`) read the data files themselves
+    prefetch = TableizePrefetch(generator, workers,
+                                read_data=tableize_config(settings).workers <= 1)
+    for filename in generator.get_files(settings[paths], exclude=settings[excludes]):
+        source_path = os.path.abspath(os.path.join(generator.path, filename))
+        prefetch.scan(filename, source_path, tableize_base_dirs(source_path, settings))
+    return prefetch
+
+
+class TableizeStats:
+    """ Build-wide instrumentation: seconds and calls per signal handler,
+        plus counters of the table work done.  `bytes_in`/`bytes_out` are the
+        lengths (in characters) of the table blocks read and of the HTML
+        written in their place."""
+    __slots__ = ('handler_seconds', 'handler_calls', 'tables', 'rows', 'cells',
+                 'bytes_in', 'bytes_out', 'cache_hits', 'cache_misses',
+                 'memo_hits', 'memo_misses')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.handler_seconds = {}
+        self.handler_calls = {}
+        self.tables = 0
+        self.rows = 0
+        self.cells = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def add_time(self, name, seconds):
+        self.handler_seconds[name] = self.handler_seconds.get(name, 0.0) + seconds
+        self.handler_calls[name] = self.handler_calls.get(name, 0) + 1
+
+    def add_table(self, span, html):
+        self.tables += 1
+        self.bytes_in += span.end - span.start
+        self.bytes_out += len(html)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def summary(self):
+        """ Return the human-readable build summary. """
+        lines = ['tableize: {0} tables, {1} rows, {2} cells, {3} chars in, '
+                 '{4} chars out, memo {5} hits / {6} misses, '
+                 'cache {7} hits / {8} misses'.format(
+                     self.tables, self.rows, self.cells, self.bytes_in,
+                     self.bytes_out, self.memo_hits, self.memo_misses,
+                     self.cache_hits, self.cache_misses)]
+        for name, seconds in sorted(self.handler_seconds.items(),
+                                    key=lambda item: -item[1]):
+            lines.append('tableize:   {0:<36} {1:9.4f}s in {2} calls'.format(
+                name, seconds, self.handler_calls[name]))
+        return '\n'.join(lines)
+
+
+# Statistics of the current build, reset by tableize_pelican_initialized_all()
+tp_stats = TableizeStats()
+
+
+class TableizeProfile:
+    """ The `profile` of a build: one cProfile profiler, enabled around
+        every signal handler and Markdown-parse rendering, and the seconds
+        spent on every source file, plus tracemalloc from start to end of the
+        build when `allocations` is the number of top allocation sites to
+        report.
+
+        Time spent rendering during the Markdown parse of a file is put on
+        that file when its content object comes next through
+        tp_content_object_init(), as its tables are."""
+    __slots__ = ('path', 'allocations', 'profiler', 'source_seconds',
+                 'parse_seconds', '_depth', '_tracing')
+
+    def __init__(self, path, allocations=0):
+        import cProfile
+        self.path = path
+        self.allocations = allocations
+        self.profiler = cProfile.Profile()
+        self.source_seconds = {}
+        self.parse_seconds = 0.0
+        self._depth = 0
+        self._tracing = False
+        if allocations:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+
+    def enable(self):
+        # a handler may run another one (e.g., a Markdown read): the
+        # profiler is only switched at the outermost level
+        if not self._depth:
+            self.profiler.enable()
+        self._depth += 1
+
+    def disable(self):
+        if self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self.profiler.disable()
+
+    def add_source(self, args, seconds):
+        """ Put `seconds` on the article/page among handler `args`, if any,
+            along with the parse time waiting for it. """
+        content = next((arg for arg in args if hasattr(arg, 'source_path')), None)
+        source_path = getattr(content, 'source_path', None)
+        if source_path is None:
+            return
+        seconds += self.parse_seconds
+        self.parse_seconds = 0.0
+        self.source_seconds[source_path] = \
+            self.source_seconds.get(source_path, 0.0) + seconds
+
+    def report(self, top=TABLEIZE_PROFILE_TOP):
+        """ Return the text report: the `top` slowest source files, and the
+            top allocation sites under tracemalloc. """
+        # (primitive calls, calls, own time, cumulative time, callers) by
+        # function
+        self.profiler.create_stats()
+        stats = self.profiler.stats.values()
+        lines = ['tableize profile: {0} calls in {1:.4f}s'.format(
+            sum(stat[1] for stat in stats), sum(stat[2] for stat in stats)), '',
+            'slowest source files:']
+        for source_path, seconds in sorted(self.source_seconds.items(),
+                                           key=lambda item: -item[1])[:top]:
+            lines.append('{0:10.4f}s  {1}'.format(seconds, source_path))
+        if self.allocations:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),))
+            current, peak = tracemalloc.get_traced_memory()
+            lines += ['', 'allocations: {0} KiB held, {1} KiB peak; top {2}:'.format(
+                current // 1024, peak // 1024, self.allocations)]
+            for statistic in snapshot.statistics('lineno')[:self.allocations]:
+                frame = statistic.traceback[0]
+                lines.append('{0:10d} KiB in {1:7d} blocks  {2}:{3}'.format(
+                    statistic.size // 1024, statistic.count, frame.filename,
+                    frame.lineno))
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """ Write `path`.pstats and the `path`.txt report. """
+        self.profiler.dump_stats(self.path + '.pstats')
+        with open(self.path + '.txt', 'w', encoding='utf-8') as handle:
+            handle.write(self.report())
+
+    def close(self):
+        """ Stop the tracing this profile started. """
+        if self._depth:
+            self._depth = 0
+            self.profiler.disable()
+        if self._tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self._tracing = False
+
+
+# Profile of the current build (a TableizeProfile), or None without `profile`
+tp_profile = None
+
+# Timing wrapper of each signal handler, created once so that connecting
+# them again (a new Pelican object, e.g., under --autoreload) is a no-op.
+tp_timed_handlers = {}
+
+
+def tableize_timed(handler):
+    """ Return `handler` wrapped to account its run time in tp_stats. """
+    timed_handler = tp_timed_handlers.get(handler)
+    if timed_handler is not None:
+        return timed_handler
+    name = handler.__name__
+    perf_counter = time.perf_counter
+
+    @functools.wraps(handler)
+    def timed_handler(*args, **kwargs):
+        profile = tp_profile
+        if profile is not None:
+            profile.enable()
+        start = perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            seconds = perf_counter() - start
+            tp_stats.add_time(name, seconds)
+            if profile is not None:
+                profile.disable()
+                profile.add_source(args, seconds)
+
+    tp_timed_handlers[handler] = timed_handler
+    return timed_handler
+
+
+def tableize_table_hash(body, template_hash, separator, ai, th, caption,
+                        inline=False):
+    """ Return the content address of a rendered table: everything that
+        goes into its HTML. """
+    key = '\0'.join((template_hash, separator, str(int(ai)), str(int(th)),
+                      caption or '', body))
+    if inline:
+        # the same cells, with their inline Markdown rendered
+        key = 'inline\0' + key
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def tableize_span_options(span, config, base_dirs=()):
+    """ Return the effective (separator, ai, th, caption, source_file) of a
+        TableSpan, applying its tag attributes over a TableizeConfig;
+        `source_file` is the path of its `src` data file, if any."""
+    attributes = span.attributes
+    separator = attributes.get(PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_SEPARATOR) \
+        or config.separator
+    if separator == '\\t':
+        separator = '\t'
+    ai = config.ai
+    if PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_AI in attributes:
+        ai = tableize_attribute_flag(attributes[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_AI])
+    th = config.th
+    if PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TH in attributes:
+        th = tableize_attribute_flag(attributes[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TH])
+    source_file = None
+    src = attributes.get(TABLEIZE_ATTRIBUTE_SRC)
+    if src:
+        if tp_prefetch is not None:
+            source_file = tp_prefetch.source(src, base_dirs)
+        if source_file is None:
+            source_file = tableize_find_source(src, base_dirs)
+        if source_file is None:
+            logger.warning('tableize: data file "%s" not found in %s; '
+                           'using the inline rows', src, ', '.join(base_dirs))
+    return separator, ai, th, attributes.get('caption'), source_file
+
+
+def tableize_render_span(span, template, config, base_dirs=(), inline=False):
+    """ Render a TableSpan with the compiled template of a TableizeConfig,
+        going through the rendered-table cache when one is active.  The
+        cells of its inline rows get their inline Markdown rendered when
+        `inline`."""
+    separator, ai, th, caption, source_file = tableize_span_options(
+        span, config, base_dirs)
+    inline = inline and source_file is None
+    cache_key = None
+    if tp_table_memo is not None or tp_table_cache is not None:
+        cache_key = tableize_table_hash(
+            span.body if source_file is None else tableize_source_stamp(source_file),
+            config.template_hash, separator, ai, th, caption, inline)
+        html = tableize_lookup_table(cache_key)
+        if html is not None:
+            if source_file is not None and tp_prefetch is not None:
+                # its rows are not needed after all
+                tp_prefetch.release(source_file)
+            return html
+    html = tableize_render_body(template, span.body, separator, ai, th, caption,
+                                config.stream_threshold, source_file, inline)
+    if cache_key is not None:
+        tableize_store_table(cache_key, html)
+    return html
+
+
+def tableize_lookup_table(cache_key):
+    """ Return the HTML of an already rendered table, from this build's memo
+        first, then from the rendered-table cache; None if neither has it."""
+    if tp_table_memo is not None:
+        html = tp_table_memo.get(cache_key)
+        if html is not None:
+            return html
+    if tp_table_cache is not None:
+        html = tp_table_cache.get_cached_data(cache_key)
+        if html is not None:
+            if tp_table_memo is not None:
+                tp_table_memo.put(cache_key, html)
+            return html
+    return None
+
+
+def tableize_store_table(cache_key, html):
+    """ Keep a freshly rendered table in the memo and the cache. """
+    if tp_table_memo is not None:
+        tp_table_memo.put(cache_key, html)
+    if tp_table_cache is not None:
+        tp_table_cache.cache_data(cache_key, html)
+
+
+def tableize_render_body(template, body, separator, ai, th, caption,
+                         stream_threshold=0, source_file=None, inline=False):
+    """ Split a table body into heads/bodies and render it, streaming the
+        rows when the body has more than `stream_threshold` lines.  Rows of a
+        `source_file` are always streamed, straight from the file; the cells
+        of the others get their inline Markdown rendered when `inline`."""
+    if source_file is not None:
+        rows = tableize_iter_file_rows(source_file, separator)
+        heads = next(rows, ()) if th else ()
+        return tableize_stream_table(template, heads, rows,
+                                     caption=caption, ai=ai, th=th)
+    rows = tableize_iter_rows(body, separator)
+    if inline:
+        rows = tableize_inline_markdown().iter_rows(rows)
+    heads = next(rows, ()) if th else ()
+    if stream_threshold and body.count('\n') > stream_threshold:
+        return tableize_stream_table(template, heads, rows,
+                                     caption=caption, ai=ai, th=th)
+    return tableize_render_table(template, heads, list(rows),
+                                 caption=caption, ai=ai, th=th)
+
+
+def tableize_render_job(job):
+    """ Render one table in a worker process.  `job` is a picklable tuple of
+        (config, body, separator, ai, th, caption, stream_threshold,
+        source_file, inline); each worker compiles a template once into its own
+        template cache.  Returns the HTML along with the number of rows and
+        cells rendered, for the parent's tp_stats."""
+    rows, cells = tp_stats.rows, tp_stats.cells
+    template = tableize_config_template(job[0])
+    html = tableize_render_body(template, *job[1:])
+    return html, tp_stats.rows - rows, tp_stats.cells - cells
+
+
+def tableize_splice(content, spans, htmls):
+    """ Return `content` with every span replaced by its rendered HTML. """
+    pieces = []
+    last = 0
+    for span, html in zip(spans, htmls):
+        pieces.append(content[last:span.start])
+        pieces.append(html)
+        last = span.end
+    pieces.append(content[last:])
+    return ''.join(pieces)
+
+
+def tableize_table_offsets(spans, htmls):
+    """ Return the (start, end) offsets of every rendered table within the
+        content spliced by tableize_splice(). """
+    offsets = []
+    shift = 0
+    for span, html in zip(spans, htmls):
+        start = span.start + shift
+        offsets.append((start, start + len(html)))
+        shift += len(html) - (span.end - span.start)
+    return tuple(offsets)
+
+
+def tableize_index_content(content_class, offsets, index, markdown_offsets=(),
+                           spans=(), htmls=()):
+    """ Record where the tables of an article/page are, on the object itself
+        (kept along with it by Pelican's content cache) and in `index`.
+        The `markdown_offsets` of the tables rendered during the Markdown
+        parse predate the splicing of the other tables (`spans` replaced by
+        `htmls`), and are moved along. """
+    if markdown_offsets:
+        moved = []
+        for start, end in markdown_offsets:
+            shift = sum(len(html) - (span.end - span.start)
+                        for span, html in zip(spans, htmls) if span.end <= start)
+            moved.append((start + shift, end + shift))
+        offsets = tuple(sorted(tuple(offsets) + tuple(moved)))
+    content_class._tableize_offsets = offsets
+    if index is not None:
+        index[content_class.source_path] = offsets
+
+
+def tableize_generator_index(generator):
+    """ Return the table index of an ArticlesGenerator/PagesGenerator. """
+    index = tp_table_indexes.get(generator)
+    if index is None:
+        index = tp_table_indexes[generator] = {}
+    return index
+
+
+def tableize_write_fragment(path, html):
+    """ Write a table fragment file, unless this build already did or it is
+        there from a previous one: the name is the hash of the HTML, so a
+        file of the same name and size holds the same table. """
+    if path in tp_written_fragments:
+        return False
+    tp_written_fragments.add(path)
+    data = html.encode('utf-8')
+    try:
+        if os.path.getsize(path) == len(data):
+            return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = path + '.part'
+    with open(partial_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(partial_path, path)
+    return True
+
+
+def tableize_remove_sidecars(path, extensions=TABLEIZE_PRECOMPRESS_EXTENSIONS):
+    """ Remove the precompressed sidecars of the file at `path` with the
+        given `extensions`, if any. """
+    for extension in extensions:
+        try:
+            os.remove('{0}.{1}'.format(path, extension))
+        except FileNotFoundError:
+            pass
+
+
+def tableize_precompress(path, data, extensions):
+    """ Write the precompressed sidecars of the file at `path`, holding
+        `data`: `path`.gz and/or `path`.br, as given by `extensions`. """
+    for extension in extensions:
+        if extension == TABLEIZE_PRECOMPRESS_GZIP:
+            import gzip
+            # no timestamp, so that the same page compresses the same
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        elif extension == TABLEIZE_PRECOMPRESS_BROTLI:
+            try:
+                import brotli
+            except ImportError:
+                # a former build's sidecar would be served in its place
+                tableize_remove_sidecars(path, (TABLEIZE_PRECOMPRESS_BROTLI,))
+                logger.warning(
+                    'tableize: the brotli package is not installed; %s.br not written',
+                    path, extra={'limit_msg': 'tableize: more .br sidecars not written'})
+                continue
+            compressed = brotli.compress(data)
+        else:
+            continue
+        sidecar_path = '{0}.{1}'.format(path, extension)
+        with open(sidecar_path + '.part', 'wb') as handle:
+            handle.write(compressed)
+        os.replace(sidecar_path + '.part', sidecar_path)
+
+
+def tableize_fragment_content(content_class, offsets, config, output_path):
+    """ Move every table of an article/page longer than `fragment_threshold`
+        characters into a fragment file of its own under `fragment_path` in
+        the output directory, leaving a stub that loads it.  Returns the
+        offsets of the tables and stubs in the new content. """
+    content = content_class._content
+    spans = []
+    htmls = []
+    moved = False
+    siteurl = content_class.get_siteurl()
+    for start, end in offsets:
+        spans.append(TableSpan(start, end, None, None))
+        html = content[start:end]
+        if len(html) <= config.fragment_threshold:
+            htmls.append(html)
+            continue
+        name = tableize_template_hash(html) + '.html'
+        fragment_file = os.path.join(output_path, config.fragment_path, name)
+        if tableize_write_fragment(fragment_file, html):
+            logger.debug('tableize: wrote fragment %s of %s', name,
+                         content_class.source_path)
+            if config.precompress and len(html) >= config.precompress_threshold:
+                tableize_precompress(fragment_file, html.encode('utf-8'),
+                                     config.precompress)
+        htmls.append(TABLEIZE_FRAGMENT_STUB.format(
+            url='/'.join((siteurl, config.fragment_path, name)),
+            size=(len(html) + 1023) // 1024))
+        moved = True
+    if not moved:
+        return offsets
+    content_class._content = tableize_splice(content, spans, htmls) + TABLEIZE_FRAGMENT_LOADER
+    # Pelican memoizes the content by (object, siteurl): drop what it may
+    # have kept from before
+    memo = getattr(getattr(content_class, 'get_content', None), 'cache', None)
+    if memo is not None:
+        memo.pop((content_class, siteurl), None)
+    return tableize_table_offsets(spans, htmls)
+
+
+def tableize_render_pending(workers):
+    """ Render every table collected in tp_pending_tables on a pool of
+        `workers` processes and splice the results back into the content.
+        Memo and cache lookups and updates stay in this process, and
+        identical tables of the batch are rendered by a single job."""
+    pending = tp_pending_tables[:]
+    del tp_pending_tables[:]
+    if not pending:
+        return
+    jobs = []
+    job_keys = []
+    job_of_key = {}
+    htmls_of = []
+    for item in pending:
+        htmls = []
+        for span in item.spans:
+            separator, ai, th, caption, source_file = tableize_span_options(
+                span, item.config, item.base_dirs)
+            inline = item.inline and source_file is None
+            cache_key = tableize_table_hash(
+                span.body if source_file is None else
+                tableize_source_stamp(source_file),
+                item.config.template_hash, separator, ai, th, caption, inline)
+            if cache_key in job_of_key:
+                if tp_table_memo is not None:
+                    tp_table_memo.hits += 1
+                htmls.append(job_of_key[cache_key])
+                continue
+            html = tableize_lookup_table(cache_key)
+            if html is not None:
+                htmls.append(html)
+                continue
+            # placeholder: index of the job whose result goes here
+            job_of_key[cache_key] = len(jobs)
+            htmls.append(len(jobs))
+            jobs.append((item.config, span.body, separator, ai, th, caption,
+                         item.config.stream_threshold, source_file, inline))
+            job_keys.append(cache_key)
+        htmls_of.append(htmls)
+
+    results = []
+    if jobs:
+        workers = max(workers, 1)
+        chunksize = max(1, len(jobs) // (workers * 4))
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for html, rows, cells in executor.map(tableize_render_job, jobs,
+                                                  chunksize=chunksize):
+                results.append(html)
+                tp_stats.rows += rows
+                tp_stats.cells += cells
+        for cache_key, html in zip(job_keys, results):
+            tableize_store_table(cache_key, html)
+
+    for item, htmls in zip(pending, htmls_of):
+        htmls = [results[html] if isinstance(html, int) else html for html in htmls]
+        for span, html in zip(item.spans, htmls):
+            tp_stats.add_table(span, html)
+        item.content_class._content = tableize_splice(item.content, item.spans, htmls)
+        tableize_index_content(item.content_class,
+                               tableize_table_offsets(item.spans, htmls), item.index,
+                               item.markdown_offsets, item.spans, htmls)
+
+
+# Types a setting takes besides that of its default value
+TABLEIZE_SETTING_EXTRA_TYPES = {
+    PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_AI: (bool, str),
+    PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_TH: (int, str),
+    PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_KEYWORD_PRECOMPRESS: (tuple, list),
+}
+
+
+def tableize_coerce_setting(value, default):
+    """ Convert a setting `value` to the type of its `default` value, e.g.,
+        '4' into 4 or 'yes' into True; raise ValueError when it cannot be. """
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return bool(tableize_attribute_flag(value))
+        if isinstance(value, int):
+            return bool(value)
+    elif isinstance(default, int):
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (str, float)):
+            number = float(value)
+            if number.is_integer():
+                return int(number)
+    raise ValueError(value)
+
+
 def check_plugin_settings(pelican):
+    """ Warn about unknown or mistyped plugin settings, and replace
+        pelican.settings['TABLEIZE_PLUGIN'] with a copy where every mistyped
+        value is converted to the type of its default, or else dropped for
+        that default. """
     if pelican is None:
         return
-    tbp_settings = copy(pelican.settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME])
-    set_default_settings(DEFAULT_CONFIG)
-    for key in tbp_settings:
-        warning_text = 'Tableize plugin -> "%s" must be ' % key
-        typeof_def_value = type(DEFAULT_CONFIG[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME][key])
-        types = {
-            str: "a string.",
-            int: "an integer.",
-            bool: "a boolean."
-        }
-        if type(tbp_settings[key]) != typeof_def_value:
-            logging.warning(warning_text + types[typeof_def_value])
+    tbp_settings = dict(pelican.settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME])
+    tbp_defaults = tableize_default_settings()
+    types = {
+        str: "a string",
+        int: "an integer",
+        bool: "a boolean"
+    }
+    for key, value in list(tbp_settings.items()):
+        if key not in tbp_defaults:
+            logger.warning('Tableize plugin -> "%s" is not a known setting.', key)
             continue
-    pelican.settings['ACE_EDITOR_PLUGIN'] = copy(
-        DEFAULT_CONFIG['ACE_EDITOR_PLUGIN']
-    )
-    set_default_settings(pelican.settings)
+        default = tbp_defaults[key]
+        if type(value) is type(default) or \
+                isinstance(value, TABLEIZE_SETTING_EXTRA_TYPES.get(key, ())):
+            continue
+        try:
+            tbp_settings[key] = tableize_coerce_setting(value, default)
+        except ValueError:
+            del tbp_settings[key]
+            logger.warning('Tableize plugin -> "%s" must be %s; %r ignored, '
+                           'default %r used.', key, types[type(default)], value,
+                           default)
+        else:
+            logger.warning('Tableize plugin -> "%s" must be %s; %r used as %r.',
+                           key, types[type(default)], value, tbp_settings[key])
+    pelican.settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME] = tbp_settings
+    # whatever the user left out is filled in by TableizeConfig.from_settings()
 
 
-# Create a new reader class, inheriting from the pelican.reader.BaseReader
-class NewReader(BaseReader):
-    enabled = True  # Yeah, you probably want that :-)
+# Reader of table source files.  Pelican registers every enabled BaseReader
+# subclass for its file extensions (and a READERS setting can still disable
+# it with {'tbl': None}).
+class TableizeReader(BaseReader):
+    """ Read a `.tbl` table source file straight into a rendered table.
 
-    # The list of file extensions you want this reader to match with.
-    # If multiple readers were to use the same extension, the latest will
-    # win (so the one you're defining here, most probably).
-    file_extensions = ['yeah']
+        The file starts with optional `Key: value` metadata lines ended by a
+        blank line, followed by one table row per line, as in a CSV/TSV `src`
+        data file.  The table is rendered by the compiled template of the
+        article's TableizeConfig, honoring the `tableize_*` metadata
+        overrides, plus `tableize_caption` for its caption.  Rows are parsed
+        and fed to the template one at a time; nothing goes through Markdown
+        (or smarty)."""
+    enabled = True
+
+    file_extensions = [TABLEIZE_READER_EXTENSION]
 
-    # You need to have a read method, which takes a filename and returns
-    # some content and the associated metadata.
     def read(self, filename):
-        metadata = {'title': 'Oh yeah',
-                    'category': 'Foo',
-                    'date': '2012-12-01'}
+        with open(filename, encoding='utf-8') as handle:
+            metadata = self.read_metadata(handle)
+            overrides = tableize_metadata_overrides(metadata)
+            config = tableize_config(self.settings).with_overrides(overrides)
+            if tp_dependencies is not None:
+                tp_dependencies.record(filename, config, overrides, (), ())
+            separator = config.separator
+            if separator == '\\t':
+                separator = '\t'
+            template = tableize_config_template(config)
+            rows = tableize_iter_record_rows(handle, separator)
+            heads = next(rows, ()) if config.th else ()
+            html = tableize_stream_table(
+                template, heads, rows, ai=config.ai, th=config.th,
+                caption=metadata.get(PELICAN_METADATA_TABLEIZE_CAPTION))
+            tp_stats.tables += 1
+            tp_stats.bytes_in += os.fstat(handle.fileno()).st_size
+            tp_stats.bytes_out += len(html)
+        return html, metadata
+
+    def read_metadata(self, handle):
+        """ Consume the metadata lines at the top of an open `.tbl` file;
+            return them processed as Pelican metadata. """
+        metadata = {}
+        position = handle.tell()
+        line = handle.readline()
+        if not TABLEIZE_READER_METADATA.match(line):
+            # no metadata: that was the first row
+            handle.seek(position)
+            return metadata
+        while line.strip():
+            match = TABLEIZE_READER_METADATA.match(line)
+            if match is None:
+                logger.warning('tableize: %s: ignoring metadata line "%s"',
+                               handle.name, line.strip())
+            else:
+                name = match.group(1).lower()
+                metadata[name] = self.process_metadata(name, match.group(2).strip())
+            line = handle.readline()
+        return metadata
+
+
+# Priority of TableizeBlockProcessor: ahead of Markdown's paragraph processor,
+# behind its indented code one, so that an indented <tableize> stays code.
+TABLEIZE_MARKDOWN_NAME = 'tableize'
+TABLEIZE_MARKDOWN_PRIORITY = 75
+
+# Priority of TableizePostprocessor: behind every postprocessor of Markdown
+# itself, once the raw HTML stash is back in the output; and the character
+# marking both ends of a rendered table until then (Markdown's own
+# placeholders use STX/ETX)
+TABLEIZE_MARKDOWN_POSTPROCESSOR_PRIORITY = 5
+TABLEIZE_MARKDOWN_MARKER = '\x0e'
+
+
+class TableizeBlockProcessor(BlockProcessor):
+    """ Claim the `<tableize>` blocks of a Markdown source during its parse.
+
+        A table is rendered straight from its Markdown source, ahead of any
+        inline processing: smarty never rewrites its attribute quotes, and its
+        cells are never escaped into HTML and parsed back out of it.  The HTML
+        goes into Markdown's raw HTML stash, outside of any paragraph.  A
+        block with a `src` data file is stashed as is, for
+        tp_content_object_init() to render once the article's directory is
+        known; so is every block when not `render`ing (see
+        tableize_markdown_renders())."""
+
+    def __init__(self, parser, config, render=True):
+        super().__init__(parser)
+        self.config = config
+        self.render = render
+
+    def test(self, parent, block):
+        block = block.lstrip()
+        following = block[len(TABLEIZE_OPEN_TAG):len(TABLEIZE_OPEN_TAG) + 1]
+        return block.startswith(TABLEIZE_OPEN_TAG) and \
+            (following == '>' or following.isspace())
+
+    def run(self, parent, blocks):
+        # blank lines in the table body split it into several blocks
+        taken = [blocks.pop(0)]
+        while TABLEIZE_CLOSE_TAG not in taken[-1] and blocks:
+            taken.append(blocks.pop(0))
+        text = '\n\n'.join(taken).lstrip()
+        span = next(tableize_iter_tables(text), None)
+        if span is None:
+            # never closed: leave it to the other processors, as text
+            blocks[0:0] = taken
+            return False
+        rest = text[span.end:]
+        if rest.strip():
+            blocks.insert(0, rest)
+
+        if not self.render or span.attributes.get(TABLEIZE_ATTRIBUTE_SRC):
+            html = text[:span.end]
+        else:
+            profile = tp_profile
+            if profile is not None:
+                profile.enable()
+                start = time.perf_counter()
+            config = self.config.with_overrides(self.metadata_overrides())
+            template = tableize_config_template(config)
+            html = tableize_render_span(span, template, config,
+                                        inline=config.inline_markdown)
+            tp_stats.add_table(span, html)
+            if profile is not None:
+                profile.disable()
+                profile.parse_seconds += time.perf_counter() - start
+            html = TABLEIZE_MARKDOWN_MARKER + html + TABLEIZE_MARKDOWN_MARKER
+
+        placeholder = self.parser.md.htmlStash.store(html)
+        if len(parent):
+            parent[-1].tail = '{0}\n{1}\n'.format(parent[-1].tail or '', placeholder)
+        else:
+            parent.text = '{0}\n{1}\n'.format(parent.text or '', placeholder)
+
+    def metadata_overrides(self):
+        """ Return the override tuple of the metadata read so far by the
+            `meta` extension (raw, not yet processed by Pelican). """
+        meta = getattr(self.parser.md, 'Meta', None) or {}
+        return tuple('\n'.join(meta[key]) if meta.get(key) else None
+                     for key in TABLEIZE_METADATA_OVERRIDES)
+
+
+class TableizePostprocessor(Postprocessor):
+    """ Take the markers around the tables rendered by TableizeBlockProcessor
+        out of the Markdown output, recording in tp_markdown_tables where
+        those tables end up in it, and what Markdown strips off the first
+        one when it starts the output."""
+
+    def run(self, text):
+        pieces = text.split(TABLEIZE_MARKDOWN_MARKER)
+        if len(pieces) < 3:
+            return text
+        text = ''.join(pieces)
+        # Markdown strips its output once the postprocessors are done
+        leading = len(text) - len(text.lstrip())
+        pos = 0
+        for number, piece in enumerate(pieces):
+            if number % 2:
+                start = pos - leading
+                tp_markdown_tables.append((max(start, 0), start + len(piece),
+                                           piece[:-start] if start < 0 else ''))
+            pos += len(piece)
+        return text
 
-        parsed = {}
-        for key, value in metadata.items():
-            parsed[key] = self.process_metadata(key, value)
 
-        return "Some content", parsed
+class TableizeExtension(Extension):
+    """ Python-Markdown extension rendering `<tableize>` blocks during the
+        Markdown parse, with TableizeBlockProcessor.
 
+        The plugin adds one to MARKDOWN['extensions'], carrying the build's
+        TableizeConfig, unless its `markdown` setting is off.  It may also be
+        listed there by name, as 'pelican.plugins.tableize.tableize', and then
+        uses the default settings."""
 
-def tableize_pelican_find_smarty(ppt_pelican):
-    global pp_tableize_sanity_found
-    global pp_tableize_initialized
+    def __init__(self, config=None, render=True, **kwargs):
+        super().__init__(**kwargs)
+        # not `config`, which holds the Markdown options of an Extension
+        self.tableize_config = config if config is not None else TableizeConfig()
+        self.render = render
 
+    def extendMarkdown(self, md):
+        # Pelican sets up a new Markdown instance for every file it reads
+        del tp_markdown_tables[:]
+        md.parser.blockprocessors.register(
+            TableizeBlockProcessor(md.parser, self.tableize_config, self.render),
+            TABLEIZE_MARKDOWN_NAME, TABLEIZE_MARKDOWN_PRIORITY)
+        md.postprocessors.register(
+            TableizePostprocessor(md), TABLEIZE_MARKDOWN_NAME,
+            TABLEIZE_MARKDOWN_POSTPROCESSOR_PRIORITY)
+
+
+def makeExtension(**kwargs):  # noqa: N802 (Markdown's entry point name)
+    return TableizeExtension(**kwargs)
+
+
+def tableize_markdown_renders(settings, config):
+    """ Tell whether tables are rendered during the Markdown parse, rather
+        than passed through it untouched and rendered after reading.
+
+        Not when `workers` renders them on a process pool; nor when Pelican
+        caches the output of its readers, which would then hold tables
+        rendered with the template and settings of a former build."""
+    if config.workers > 1:
+        return False
+    return not (settings.get('CACHE_CONTENT')
+                and settings.get('CONTENT_CACHING_LAYER') == 'reader')
+
+
+def tableize_markdown_register(settings, config):
+    """ Put a TableizeExtension of `config` into the MARKDOWN settings,
+        replacing the one of a previous build. """
+    markdown_settings = dict(settings.get('MARKDOWN') or {})
+    extensions = [extension for extension in markdown_settings.get('extensions', ())
+                  if not isinstance(extension, TableizeExtension)]
+    extensions.append(TableizeExtension(
+        config, render=tableize_markdown_renders(settings, config)))
+    markdown_settings['extensions'] = extensions
+    settings['MARKDOWN'] = markdown_settings
+
+
+def tableize_pelican_find_smarty(settings):
+    """ Return True when Markdown's smarty extension is configured in the
+        pelican.settings dict, i.e., when quotes in the content (attribute
+        quotes included) may come to us as `&ldquo;`-like entities."""
     # See if MARKDOWN item is in the Pelican configuration settings
-    if 'MARKDOWN' in ppt_pelican.settings.keys():
+    if 'MARKDOWN' in settings.keys():
         logger.debug('MARKDOWN is in pelican.settings;')
         # check that MARKDOWN is a [] dict type
-        if isinstance(ppt_pelican.settings['MARKDOWN'], dict):
+        if isinstance(settings['MARKDOWN'], dict):
             # get the settings of Markdown "plugin"
-            pp_markdown_settings = ppt_pelican.settings['MARKDOWN']
+            pp_markdown_settings = settings['MARKDOWN']
             logger.debug('MARKDOWN is a dict type')
             # check for existence of 'extension_configs' item in MARKDOWN[] dict
             if 'extension_configs' in pp_markdown_settings.keys():
                 logger.debug('extension_configs item found in MARKDOWN dict')
                 pp_markdown_exts_configs = pp_markdown_settings['extension_configs']
                 if 'markdown.extensions.smarty' in pp_markdown_exts_configs.keys():
-                    logger.info('markdown.extensions.smarty is found in ' +
-                                'MARKDOWN[\'extension_configs\'] dict')
+                    logger.debug('markdown.extensions.smarty is found in ' +
+                                 'MARKDOWN[\'extension_configs\'] dict')
                     # Compensate for other processor replacing single/double quote
                     # symbols with &rdquo
-                    pp_tableize_sanity_found = True
-                else:
-                    logger.info('markdown.extensions.smarty is NOT found in ' +
-                                'MARKDOWN[\'extension_config\'] dict; Check config ' +
-                                'file; tableize plugin is disabled')
-                    pp_tableize_sanity_found = False
-                return
+                    return True
+                logger.debug('markdown.extensions.smarty is NOT found in ' +
+                             'MARKDOWN[\'extension_config\'] dict')
             else:
                 logger.debug(
-                    '\'extension_configs\' not in MARKDOWN dict; Check config file;' +
-                    'tableize plugin is disabled')
-                pp_tableize_sanity_found = False
+                    '\'extension_configs\' not in MARKDOWN dict')
         else:
-            logger.debug(
-                'MARKDOWN dict does not exist; Check config file;' +
-                'tableize plugin is disabled')
-            pp_tableize_sanity_found = False
-    else:
-        pp_tableize_sanity_found = False
-
-    pp_tableize_initialized = True
+            logger.debug('MARKDOWN is not a dict type')
+    return False
 
 
 def tableize_pelican_initialized_all(pelican):
@@ -262,49 +2606,122 @@ def tableize_pelican_initialized_all(pelican):
             'pelican.settings is not a dict type; tableize plugin is disabled')
         return
 
-    plugin_logger = logging.getLogger(__name__)
     tpp_pelican_settings = tpp_pelican.settings  # NOQA
-    # Check the MARKDOWN "plugin" to see if they got features that runs
-    # counterproductive to this plugin's effort of dealing with single/double quotes
 
     tableize_settings = pelican.settings.get(PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME)
     if tableize_settings is None:
         logger.warning('%s does not exist in pelican.settings; ' +
                        'plugin\'s built-in defaults used',
                        PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME)
-        # this is the part where we must implicitly declare our defaults
-        set_default_settings(pelican.settings)
     else:
         # explicit settings for this plugin are found in
         #     pelican.settings['TABLEIZE_PLUGIN']
         logger.debug('{0!s} exists in pelican.settings'.format(
             PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME))
-        tableize_settings = copy(
-            tpp_pelican_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME])
         check_plugin_settings(tpp_pelican)
+    # Resolve the settings once for the whole build: every handler, article
+    # and worker process then reads this one immutable TableizeConfig.
     # This plugin settings is never in pelican's DEFAULT_CONFIG, so we skip that
     # Any explicit plugin setting is found ONLY in `pelican.settings`
+    config = TableizeConfig.from_settings(tpp_pelican_settings)
+    tpp_pelican_settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_CONFIG_NAME] = config
+
+    # a new build (e.g., under --autoreload) starts from fresh statistics
+    # and table indexes, with nothing left queued by an interrupted one
+    tp_stats.reset()
+    tp_table_indexes.clear()
+    tp_written_fragments.clear()
+    del tp_pending_tables[:]
+
+    # Compile the site-wide template once, up front; every table rendered in
+    # tp_content_object_init() then reuses it from the template cache.
+    global tp_template_cache_size
+    tp_template_cache_size = config.template_cache_size
+    tableize_config_template(config)
 
-    tableize_pelican_find_smarty(tpp_pelican)
+    if TABLEIZE_PRECOMPRESS_BROTLI in config.precompress:
+        try:
+            import brotli  # NOQA
+        except ImportError:
+            logger.warning('tableize: the brotli package is not installed; '
+                           'no .br sidecars will be written')
 
-    tpp_pelican.settings.setdefault('TABLEIZE_AUTO_INDEX',
-                                    DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_AUTO_INDEX)
-    tpp_pelican.settings.setdefault('TABLEIZE_TABLE_HEADER',
-                                    DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TABLE_HEADER)
-    tpp_pelican.settings.setdefault('TABLEIZE_SEPARATOR',
-                                    DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_SEPARATOR)
-    tpp_pelican.settings.setdefault('TABLEIZE_TEMPLATE',
-                                    DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE)
+    # Markdown content gets its tables rendered while it is parsed
+    if config.markdown and Extension is not object:
+        tableize_markdown_register(tpp_pelican_settings, config)
+    elif tableize_pelican_find_smarty(tpp_pelican_settings):
+        # Check the MARKDOWN "plugin" for features that run counterproductive
+        # to this plugin: smarty then gets to the table source as well
+        logger.warning('tableize: Markdown\'s smarty extension will turn the '
+                       'quotes of table cells into curly quotes; keep the '
+                       'tableize `markdown` setting on to avoid that')
 
-    # save back into pelican.settings
-    pelican.settings[PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME] = \
-        tableize_settings
-    # tableize_settings is going to disappear when we leave this function
-    # store it back into pelican.settings? or leave as plugin's global object?
+    # A build interrupted while reading its articles may have left some
+    # data files being prefetched
+    tableize_prefetch_close()
+
+    # Profiled from here on, until tableize_pelican_finalized()
+    global tp_profile
+    if tp_profile is not None:
+        tp_profile.close()
+    tp_profile = None
+    if config.profile:
+        tp_profile = TableizeProfile(config.profile, config.profile_allocations)
+
+    # Identical tables are rendered once per build
+    global tp_table_memo
+    tp_table_memo = TableizeMemo(config.memo_size) if config.memo_size else None
+
+    # Rendered tables survive between builds only alongside Pelican's own
+    # content cache
+    global tp_table_cache
+    global tp_dependencies
+    tp_table_cache = None
+    tp_dependencies = None
+    if tpp_pelican_settings.get('CACHE_CONTENT'):
+        tp_table_cache = TableizeCache(tpp_pelican_settings, config.cache_size)
+        tp_dependencies = TableizeDependencies(tpp_pelican_settings)
+
+    # only the handlers of the features this build uses get to run
+    tableize_connect_handlers(config, tpp_pelican_settings)
 
     logger.debug('tableize pelican plugin initialized')
 
 
+def tableize_connect_handlers(config, settings):
+    """ Connect the signal handlers the features of this build need, given
+        its TableizeConfig and pelican.settings, and disconnect the others:
+        a build without any of them only runs tp_content_object_init() and
+        tp_content_written(). """
+    index = bool(config.fragment_threshold)
+    cache = bool(settings.get('CACHE_CONTENT'))
+    workers = config.workers > 1
+    prefetch = bool(config.prefetch_workers)
+    handlers = (
+        (signals.article_generator_init, tp_article_init, index or cache),
+        (signals.page_generator_init, tp_page_init, index or cache),
+        (signals.article_generator_preread, tp_article_preread,
+         index or cache or prefetch),
+        (signals.page_generator_preread, tp_page_preread, index or cache or prefetch),
+        (signals.article_generator_pretaxonomy, tp_article_pretaxonomy,
+         index or workers or prefetch),
+        (signals.article_generator_finalized, tp_article_finalized, index or cache),
+        (signals.page_generator_finalized, tp_page_finalized,
+         index or cache or workers or prefetch),
+        (signals.all_generators_finalized, tp_all_generators_finalized,
+         workers or prefetch),
+        (signals.article_generator_write_article, tp_article_write, index),
+        (signals.page_generator_write_page, tp_page_write, index),
+        # also without `precompress`, to remove the sidecars of former builds
+        (signals.content_written, tp_content_written, True),
+    )
+    for signal, handler, needed in handlers:
+        if needed:
+            signal.connect(tableize_timed(handler))
+        else:
+            signal.disconnect(tableize_timed(handler))
+
+
 def tp_article_init(articles_generator):
     # arg1 : articles_generator:ArticlesGenerator
     #
@@ -326,9 +2743,57 @@ def tp_article_init(articles_generator):
     #
     # Hooked by signals.article_generator_init.connect()
     logger.info('tp_article_init called: path is ' + articles_generator.path)
+    # start the index of the articles this generator is about to read
+    tp_table_indexes[articles_generator] = {}
+
+    tableize_prune_content_cache(articles_generator)
     return
 
 
+def tp_page_init(pages_generator):
+    # arg1 : pages_generator:PagesGenerator
+    #
+    # 1st page-related signal, sent at the end of PagesGenerator.__init__(),
+    # once the generator has loaded Pelican's content cache.
+    #
+    # Hooked by signals.page_generator_init.connect()
+    logger.debug('tp_page_init called')
+    # start the index of the pages this generator is about to read
+    tp_table_indexes[pages_generator] = {}
+
+    tableize_prune_content_cache(pages_generator)
+    return
+
+
+def tableize_prune_content_cache(generator):
+    """ Drop from the content cache a generator has just loaded the
+        articles/pages whose tables depend on a template, setting or data
+        file that changed since, so that they alone are read and rendered
+        again.  That is the cache of the generator itself or, under
+        Pelican's CONTENT_CACHING_LAYER = 'reader', the one of its readers,
+        where only table source files hold rendered tables."""
+    generator_cache = getattr(generator, '_cache', None)
+    readers_cache = getattr(getattr(generator, 'readers', None), '_cache', None)
+    if tp_dependencies is None or not (generator_cache or readers_cache):
+        return
+    stale_paths = tp_dependencies.stale_paths(tableize_config(generator.settings))
+    if not stale_paths:
+        return
+    # the generator's cache is keyed by paths like './post.md'
+    filenames = {os.path.abspath(os.path.join(generator.path, filename)): filename
+                 for filename in generator_cache or ()}
+    for source_path in stale_paths:
+        source_path = os.path.abspath(source_path)
+        filename = filenames.get(source_path)
+        if filename is not None:
+            del generator_cache[filename]
+            logger.debug('tableize: %s is out of date', filename)
+        # the readers' cache is keyed by absolute paths
+        if readers_cache and source_path.endswith('.' + TABLEIZE_READER_EXTENSION) \
+                and readers_cache.pop(source_path, None) is not None:
+            logger.debug('tableize: %s is out of date', source_path)
+
+
 def tp_article_preread(articles_generator):
     # Description:
     #     useful for modifying file-related variables before reading
@@ -354,43 +2819,46 @@ def tp_article_preread(articles_generator):
     #
     # Hooked by signals.article_generator_preread.connect().
     #
-    print('tp_article_preread called')
+    # Sent before each article is read: the first one starts prefetching the
+    # data files of all the articles of this generator.
+    tableize_generator_preread(articles_generator, 'ARTICLE_PATHS', 'ARTICLE_EXCLUDES')
     return
 
 
-def tp_article_context(articles_generator, metadata=[]):
-    # Description:
-    #     context and metadata are added here the first time for
-    #     ArticlesGenerator but still no content yet.
+def tp_page_preread(pages_generator):
+    # arg1 : pages_generator:PagesGenerator
     #
-    # arg1 : articles_generator:ArticlesGenerator
-    # arg2 : metadata:dict
+    # Sent by Readers.read_file() before each page is read, as
+    # article_generator_preread is for articles.
     #
-    # articles_generator of ArticlesGenerator class provides the
-    # following variable member items:
-    #   articles:list, authors:dict, categories:dict, context:dict,
-    #   dates:dict, drafts:list,
-    #   drafts_translations:list, env:Environment, hidden_articles:list,
-    #   hidden_translations:list, output_path:str, path:str, period_archives:dict,
-    #   readers:Readers, related_posts:list, settings:dict, tags:dict, theme:str,
-    #   and translations:list.  (No content here, yet)
+    # Hooked by signals.page_generator_preread.connect().
     #
-    # metadata of dict type provides the following variable member items:
-    #   status:str, category:Category, reader:str, title:str, data:SafeDatetime,
-    #   tags:list, summary:str, lang:str, private:str, and __len__:int.
-    #
-    # 3rd article-related signal.
-    # 2nd signal for entire ArticleGenerator.generate_context().
-    # 1st param is Generator type (ArticlesGenerator/PagesGenerator/StaticGenerator).
-    # 2nd param is metadata dict object (what you see in first few lines of an
-    #     article/page/static file).
-    #
-    # Hooked by signals.article_generator_context.connect().
-    #
-    print('tp_article_context called')
+    tableize_generator_preread(pages_generator, 'PAGE_PATHS', 'PAGE_EXCLUDES')
     return
 
 
+def tableize_generator_preread(generator, paths, excludes):
+    """ Get ready for a generator to read one of its source files: record
+        the tables of what it reads in its own index, and start prefetching
+        the data files of its source files (those of its `paths` setting,
+        less its `excludes`). """
+    global tp_current_index
+    tp_current_index = tableize_generator_index(generator)
+    tableize_prefetch_start(generator, paths, excludes)
+
+
+def tableize_prefetch_start(generator, paths, excludes):
+    """ Start prefetching the data files of the source files of a generator
+        (those of its `paths` setting, less its `excludes`), unless that is
+        already under way. """
+    global tp_prefetch
+    if tp_prefetch is None or tp_prefetch.generator is not generator:
+        workers = tableize_config(generator.settings).prefetch_workers
+        if workers:
+            tableize_prefetch_close()
+            tp_prefetch = tableize_prefetch_generator(generator, workers, paths, excludes)
+
+
 def tp_content_object_init(content_class: object):
     # Description:
     #   First signal handler to provide the actual content of any article/page/static
@@ -423,17 +2891,77 @@ def tp_content_object_init(content_class: object):
     #
     # Hooked using signals.content_object_init.connect(tp_content_object_init).
     #
-    print('tp_content_object_init called')
     if content_class is None:
         return
-    content = content_class.content
+    # the tables TableizeBlockProcessor rendered while Markdown read it
+    markdown_offsets = tuple((start, end) for start, end, _ in tp_markdown_tables)
+    stripped = tp_markdown_tables[0][2] if tp_markdown_tables else ''
+    del tp_markdown_tables[:]
+    # `_content`, not `content`: the latter is memoized by Pelican and would
+    # keep serving the pre-tableize text after we replace the tables below.
+    content = getattr(content_class, '_content', None)
+    if stripped and content is not None:
+        # a table starting the content lost its leading whitespace when
+        # Markdown stripped its output; give it back, as a table rendered
+        # after reading (e.g., under `workers`) keeps it
+        content = content_class._content = stripped + content
+        markdown_offsets = ((0, markdown_offsets[0][1] + len(stripped)),) + tuple(
+            (start + len(stripped), end + len(stripped))
+            for start, end in markdown_offsets[1:])
 
-    print('tp_content_object_init: content: {0!s}'.format(content))
+    # Most contents have no table at all: turn them away with a single
+    # substring scan, before any parsing or settings lookup.
+    if not content:
+        return
+    if not markdown_offsets and TABLEIZE_OPEN_TAG not in content:
+        # but a table source file was rendered whole by TableizeReader
+        source_path = getattr(content_class, 'source_path', None) or ''
+        if source_path.endswith('.' + TABLEIZE_READER_EXTENSION) and \
+                isinstance(content_class, (Article, Page)):
+            tableize_index_content(content_class, ((0, len(content)),),
+                                   tp_current_index)
+        return
 
     # Only process Article or Page subclass contents
     if not (isinstance(content_class, Article) or isinstance(content_class, Page)):
         return
 
+    spans = tableize_iter_tables(content)
+    first_span = next(spans, None)
+    if first_span is None and not markdown_offsets:
+        return
+    spans = list(chain((first_span,), spans)) if first_span is not None else []
+    overrides = tableize_content_overrides(content_class)
+    config = tableize_config(content_class.settings).with_overrides(overrides)
+    base_dirs = tableize_content_base_dirs(content_class)
+    inline = tableize_content_inline(content_class, config)
+    if tp_dependencies is not None:
+        tp_dependencies.record(content_class.source_path, config, overrides,
+                               spans, base_dirs)
+
+    if not spans:
+        tableize_index_content(content_class, (), tp_current_index, markdown_offsets)
+        return
+
+    if config.workers > 1:
+        # rendered along with the rest of the generator's tables, see
+        # tableize_render_pending()
+        tp_pending_tables.append(TableizePending(
+            content_class, content, spans, config, base_dirs, tp_current_index,
+            markdown_offsets, inline))
+        return
+
+    # compiled once per template source, shared by all tables of this article
+    template = tableize_config_template(config)
+    htmls = []
+    for span in spans:
+        html = tableize_render_span(span, template, config, base_dirs, inline)
+        tp_stats.add_table(span, html)
+        htmls.append(html)
+    content_class._content = tableize_splice(content, spans, htmls)
+    tableize_index_content(content_class, tableize_table_offsets(spans, htmls),
+                           tp_current_index, markdown_offsets, spans, htmls)
+
     return
 
 
@@ -464,10 +2992,33 @@ def tp_article_pretaxonomy(articles_generator):
     #
     # Hooked by signals.article_generator_pretaxonomy.connect(tp_article_pretaxonomy).
     #
-    print('tp_article_pretaxonomy called')
+    logger.debug('tp_article_pretaxonomy called')
+    # Every article of this generator has been read: render the tables
+    # collected for the process pool before anything gets finalized/written.
+    tableize_generator_read(articles_generator)
     return
 
 
+def tableize_generator_read(generator):
+    """ Wrap up the reading of the articles/pages of a generator: render in
+        one batch the tables it queued for the process pool, and index its
+        contents restored from Pelican's content cache. """
+    # No prefetch thread is left running by then, as the pool forks.
+    if tp_prefetch is not None:
+        tp_prefetch.close()
+    tableize_render_pending(tableize_config(generator.settings).workers)
+    tableize_prefetch_close()
+
+    # Contents restored from Pelican's content cache were never seen by
+    # tp_content_object_init(): index them from what they carry along.
+    index = tableize_generator_index(generator)
+    for name in TABLEIZE_GENERATOR_CONTENT_LISTS:
+        for content_class in getattr(generator, name, ()):
+            offsets = getattr(content_class, '_tableize_offsets', None)
+            if offsets and content_class.source_path not in index:
+                index[content_class.source_path] = offsets
+
+
 def tp_article_finalized(articles_generator):
     # Description:
     #
@@ -488,7 +3039,58 @@ def tp_article_finalized(articles_generator):
     #
     # Hooked by signals.article_generator_finalized.connect(tp_article_finalized).
     #
-    print('tp_article_finalized called')
+    logger.debug('tp_article_finalized called')
+    # this generator is done reading articles
+    global tp_current_index
+    tp_current_index = None
+    logger.debug('tableize: %d articles of %s contain tables',
+                 len(tableize_generator_index(articles_generator)),
+                 articles_generator.path)
+    return
+
+
+def tp_page_finalized(pages_generator):
+    # Description:
+    #
+    # arg1 : pages_generator:PagesGenerator
+    #
+    # pages_generator of PagesGenerator class provides the following
+    # variable member items:
+    #   context:dict, draft_pages:list, draft_translations:list, env:Environment,
+    #   hidden_pages:list, hidden_translations:list, output_path:str, pages:list,
+    #   path:str, readers:Readers, settings:dict, theme:str, translations:list.
+    #
+    # The last signal in PagesGenerator.generate_context(), every page read,
+    # none written yet.
+    #
+    # Hooked by signals.page_generator_finalized.connect(tp_page_finalized).
+    #
+    logger.debug('tp_page_finalized called')
+    # render the tables of the pages queued for the process pool, as
+    # tp_article_pretaxonomy() does for the articles
+    tableize_generator_read(pages_generator)
+    # this generator is done reading pages
+    global tp_current_index
+    tp_current_index = None
+    return
+
+
+def tp_all_generators_finalized(generators):
+    # arg1 : generators:list, of every generator of the build
+    #
+    # Sent once every generator has read its contents, before any is
+    # written.
+    #
+    # Hooked by signals.all_generators_finalized.connect().
+    #
+    logger.debug('tp_all_generators_finalized called')
+    # Anything still queued for the process pool (contents read by another
+    # generator, e.g. of another plugin) is rendered in one last batch.
+    if tp_prefetch is not None:
+        tp_prefetch.close()
+    if tp_pending_tables:
+        tableize_render_pending(tp_pending_tables[0].config.workers)
+    tableize_prefetch_close()
     return
 
 
@@ -523,17 +3125,125 @@ def tp_article_write(articles_generator, content=[]):
     #
     # Hooked by signals.article_generator_write_article.connect(tp_article_write).
     #
-    print('tp_article_write called')
+    tableize_write_content(articles_generator, content)
     return
 
 
+def tp_page_write(pages_generator, content=None):
+    #
+    # arg1 : pages_generator:PagesGenerator
+    # arg2 : content:Page
+    #
+    # Sent by PagesGenerator.generate_output() before each page is written.
+    #
+    # Hooked by signals.page_generator_write_page.connect(tp_page_write).
+    #
+    tableize_write_content(pages_generator, content)
+    return
+
+
+def tableize_write_content(generator, content):
+    """ Move the huge tables of an article/page about to be written into
+        fragment files. """
+    # Looked up in the generator's index, never by rescanning the content.
+    index = tableize_generator_index(generator)
+    offsets = index.get(getattr(content, 'source_path', None))
+    if not offsets:
+        return
+    logger.debug('tableize: writing %s with %d tables', content.source_path,
+                 len(offsets))
+    # Huge tables go into fragment files, written once however many
+    # articles and translations use them.
+    config = tableize_content_config(content)
+    if config.fragment_threshold:
+        offsets = tableize_fragment_content(content, offsets, config,
+                                            generator.output_path)
+        index[content.source_path] = content._tableize_offsets = offsets
+
+
+def tp_content_written(path, context=None):
+    #
+    # arg1 : path:str, of the file just written
+    # arg2 : context:dict, the template context it was written with; holds
+    #   the article or page of that file, if any
+    #
+    # Sent by Writer.write_file() after every file it writes.
+    #
+    # Hooked by signals.content_written.connect(tp_content_written).
+    #
+    content = (context or {}).get('article') or (context or {}).get('page')
+    if content is None:
+        return
+    offsets = getattr(content, '_tableize_offsets', None)
+    extensions = ()
+    if offsets:
+        config = tableize_content_config(content)
+        if sum(end - start for start, end in offsets) >= config.precompress_threshold:
+            extensions = config.precompress
+    # the output directory is not emptied between builds (by default), and
+    # a sidecar left by a former one would be served instead of this page
+    tableize_remove_sidecars(path, [extension for extension in
+                                    TABLEIZE_PRECOMPRESS_EXTENSIONS
+                                    if extension not in extensions])
+    if extensions:
+        # the web server can then serve this page without compressing it on
+        # every request
+        with open(path, 'rb') as handle:
+            tableize_precompress(path, handle.read(), extensions)
+    return
+
+
+def tableize_pelican_finalized(pelican):
+    # arg1 : pelican:Pelican object
+    #
+    # Last signal of a build: all the output has been written.
+    #
+    # Hooked by signals.finalized.connect().
+    #
+    if tp_table_cache is not None:
+        tp_table_cache.save_cache()
+        tp_stats.cache_hits = tp_table_cache.hits
+        tp_stats.cache_misses = tp_table_cache.misses
+    if tp_table_memo is not None:
+        tp_stats.memo_hits = tp_table_memo.hits
+        tp_stats.memo_misses = tp_table_memo.misses
+    if tp_dependencies is not None:
+        tp_dependencies.save_cache()
+
+    logger.info(tp_stats.summary())
+    global tp_profile
+    profile = tp_profile
+    tp_profile = None
+    if profile is not None:
+        try:
+            profile.write()
+            logger.info('tableize: profile written to %s.pstats and %s.txt',
+                        profile.path, profile.path)
+        except OSError as err:
+            logger.warning('tableize: cannot write the profile to %s: %s',
+                           profile.path, err)
+        finally:
+            profile.close()
+    stats_file = tableize_config(pelican.settings).stats_file
+    if stats_file:
+        try:
+            with open(stats_file, 'w', encoding='utf-8') as handle:
+                json.dump(tp_stats.as_dict(), handle, indent=2, sort_keys=True)
+        except OSError as err:
+            logger.warning('tableize: cannot write statistics to %s: %s',
+                           stats_file, err)
+
+
 # This is how pelican plugin works.
 # register() is a well-established function name used by Pelican plugin
 # handler for this plugin to get recognized, inserted, initialized, and
 # its processors added into and by the Pelican app.
 def register():
-
-    signals.initialized.connect(tableize_pelican_initialized_all)
+    # Every handler is connected through its tableize_timed() wrapper so that
+    # the build summary accounts for the time spent in each of them.
+    # Only those every build needs are connected here; the rest wait for
+    # tableize_pelican_initialized_all() to know which features are on.
+    signals.initialized.connect(tableize_timed(tableize_pelican_initialized_all))
 
     # Different version of Pelican behave differently.
     # By using 'try', we ensure that all signals are available before
@@ -543,42 +3253,39 @@ def register():
         # signals.get_generators.connect()
         # signals.readers_init()
         # signals.generator_init()
-        signals.article_generator_init.connect(tp_article_init)
-        # signals.readers_init()
-        # signals.readers_init()
-        # signals.generator_init()
-        # signals.page_generator_init()
-        # signals.readers_init()
-        # signals.generator_init()
-        # signals.readers_init()
-        # signals.generator_init()
+        # signals.article_generator_init.connect(tp_article_init)
+        # signals.page_generator_init.connect(tp_page_init)
         # signals.static_generator_init()
-        signals.article_generator_preread.connect(tp_article_preread)
-        signals.article_generator_context.connect(tp_article_context)
-        signals.content_object_init.connect(tp_content_object_init)
-        signals.article_generator_pretaxonomy.connect(tp_article_pretaxonomy)
-        signals.article_generator_finalized.connect(tp_article_finalized)
+        # signals.article_generator_preread.connect(tp_article_preread)
+        # signals.article_generator_context()
+        signals.content_object_init.connect(tableize_timed(tp_content_object_init))
+        # signals.article_generator_pretaxonomy.connect(tp_article_pretaxonomy)
+        # signals.article_generator_finalized.connect(tp_article_finalized)
         # signals.page_generator_preread.connect(tp_page_preread)
-        # signals.page_generator_context.connect(tp_page_context)
-        # signals.content_object_init.connect(tp_content_object_init)
+        # signals.page_generator_context()
         # signals.page_generator_finalized.connect(tp_page_finalized)
-        # signals.static_generator_preread.connect(tp_static_preread)
-        # signals.static_generator_context.connect(tp_static_context)
-        # signals.content_object_init.connect(tp_content_object_init)
-        # signals.static_generator_finalized.connect(tp_static_finalized)
+        # signals.static_generator_preread()
+        # signals.static_generator_context()
+        # signals.static_generator_finalized()
         # signals.all_generators_finalized.connect(tp_all_generators_finalized)
         # signals.get_writers()
         # signals.feed_generated()
         # signals.feed_written()
-        signals.article_generator_write_article.connect(tp_article_write)
-        # signals.content_written()
-        # signals.article_writer_finalized.connect(tp_article_write)
-        # signals.page_generator_write_page.connect(tp_article_write)
-        # signals.content_written()
+        # signals.article_generator_write_article.connect(tp_article_write)
+        # signals.content_written.connect(tp_content_written)
+        # signals.article_writer_finalized()
+        # signals.page_generator_write_page.connect(tp_page_write)
         # signals.page_writer_finalized()
-        # signals.content_written()
-        # signals.pelican_finalized()
+        #
+        # Static files are copied as they are, tables and all: no
+        # static_generator_* handler.
+        #
+        # The commented-out handlers above are connected by
+        # tableize_connect_handlers() once the settings are known, and only
+        # for the features of the build that need them.
+        signals.finalized.connect(tableize_timed(tableize_pelican_finalized))
     except Exception as e:
+        import pprint
         logger.exception('Plugin failed to execute: {}'.format(pprint.pformat(e)))
 
     logger.info(
@@ -0,0 +1,1504 @@
+from copy import deepcopy
+from datetime import datetime
+import gzip
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from pelican.contents import Article, Page
+from pelican.readers import MarkdownReader, Readers
+from pelican.settings import DEFAULT_CONFIG
+
+from . import tableize
+
+
+@pytest.fixture(autouse=True)
+def empty_template_cache():
+    tableize.tp_template_cache.clear()
+    yield
+    tableize.tp_template_cache.clear()
+    tableize.tp_template_cache_size = \
+        tableize.DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE_CACHE_SIZE
+    tableize.tp_table_cache = None
+    tableize.tp_table_memo = None
+    tableize.tp_dependencies = None
+    del tableize.tp_pending_tables[:]
+    tableize.tp_stats.reset()
+    tableize.tp_table_indexes.clear()
+    tableize.tp_current_index = None
+    del tableize.tp_markdown_tables[:]
+    tableize.tableize_prefetch_close()
+    if tableize.tp_profile is not None:
+        tableize.tp_profile.close()
+        tableize.tp_profile = None
+    tableize.tableize_connect_handlers(tableize.TableizeConfig(), {})
+
+
+def make_pelican(**plugin_settings):
+    settings = deepcopy(DEFAULT_CONFIG)
+    if plugin_settings:
+        settings[tableize.PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME] = plugin_settings
+    return SimpleNamespace(settings=settings)
+
+
+class FakeGenerator:
+    """ The parts of an ArticlesGenerator the plugin's handlers use. """
+
+    def __init__(self, settings, articles=()):
+        self.settings = settings
+        self.path = settings['PATH']
+        self.articles = list(articles)
+
+    def get_files(self, paths, exclude=()):
+        return sorted(os.path.relpath(os.path.join(root, name), self.path)
+                      for root, _dirs, names in os.walk(self.path) for name in names)
+
+
+def make_article(content, settings=None, source_path='tables.md', **metadata):
+    metadata.setdefault('title', 'Tables')
+    metadata.setdefault('date', datetime(2024, 1, 1))
+    metadata.setdefault('category', 'test')
+    if settings is None:
+        settings = deepcopy(DEFAULT_CONFIG)
+    return Article(content, metadata=metadata, settings=settings,
+                   source_path=source_path)
+
+
+def test_default_template_compiles_and_renders():
+    template = tableize.tableize_get_template(
+        tableize.DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE)
+    html = tableize.tableize_render_table(
+        template, ['a', 'b'], [['1', '2'], ['3', '4']], caption='cap', ai=1, th=True)
+    assert '<caption> cap </caption>' in html
+    assert '<th class="tableize">a</th>' in html
+    assert '<td class="tableize">2  </td>' in html
+    assert html.count('<tr class="tableize">') == 3
+
+
+def test_template_is_compiled_once_per_source():
+    first = tableize.tableize_get_template('{{ caption }}')
+    second = tableize.tableize_get_template('{{ caption }}')
+    other = tableize.tableize_get_template('<b>{{ caption }}</b>')
+    assert first is second
+    assert other is not first
+    assert len(tableize.tp_template_cache) == 2
+
+
+def test_template_cache_is_bounded_lru():
+    tableize.tp_template_cache_size = 2
+    first = tableize.tableize_get_template('1{{ ai }}')
+    tableize.tableize_get_template('2{{ ai }}')
+    tableize.tableize_get_template('1{{ ai }}')  # refresh the first entry
+    tableize.tableize_get_template('3{{ ai }}')
+    assert len(tableize.tp_template_cache) == 2
+    assert tableize.tableize_template_hash('2{{ ai }}') not in tableize.tp_template_cache
+    assert tableize.tableize_get_template('1{{ ai }}') is first
+
+
+def test_initialized_compiles_configured_template():
+    pelican = make_pelican(template='<p>{{ caption }}</p>', template_cache_size=4)
+    tableize.tableize_pelican_initialized_all(pelican)
+    key = tableize.tableize_template_hash('<p>{{ caption }}</p>')
+    assert key in tableize.tp_template_cache
+    assert tableize.tp_template_cache_size == 4
+    config = tableize.tableize_config(pelican.settings)
+    assert config.separator == '|'
+    assert config.template_hash == key
+
+
+def test_article_template_override_gets_own_entry():
+    pelican = make_pelican(engine='jinja')
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = make_article('text', settings=pelican.settings,
+                           tableize_template='<i>{{ caption }}</i>')
+    site_template = tableize.tableize_content_template(
+        make_article('text', settings=pelican.settings))
+    article_template = tableize.tableize_content_template(article)
+    assert article_template is not site_template
+    assert article_template.render(caption='x') == '<i>x</i>'
+    assert len(tableize.tp_template_cache) == 2
+
+
+def test_config_is_resolved_once_and_immutable():
+    pelican = make_pelican(th=True, separator=',')
+    tableize.tableize_pelican_initialized_all(pelican)
+    config = tableize.tableize_config(pelican.settings)
+    assert (config.separator, config.ai, config.th) == (',', 1, 1)
+    # later changes to the settings dict do not leak into the build
+    pelican.settings['TABLEIZE_PLUGIN']['separator'] = ';'
+    assert tableize.tableize_config(pelican.settings) is config
+    with pytest.raises(AttributeError):
+        config.separator = ';'
+    assert deepcopy(pelican.settings)['TABLEIZE_PLUGIN_CONFIG'] is config
+    assert not hasattr(config, '__dict__')
+
+
+def test_mistyped_settings_are_coerced_or_dropped(caplog):
+    pelican = make_pelican(workers='2', markdown='no', stream_threshold=50.0,
+                           separator=1, cache_size='big', ai=True,
+                           precompress=['gz'], colour='red')
+    with caplog.at_level('WARNING', logger=tableize.__name__):
+        tableize.tableize_pelican_initialized_all(pelican)
+    config = tableize.tableize_config(pelican.settings)
+    assert (config.workers, config.markdown, config.stream_threshold) == (2, False, 50)
+    assert config.separator == '|'
+    assert config.cache_size == tableize.DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_CACHE_SIZE
+    assert (config.ai, config.precompress) == (1, ('gz',))
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 6
+    assert 'Tableize plugin -> "workers" must be an integer; \'2\' used as 2.' in messages
+    assert 'Tableize plugin -> "colour" is not a known setting.' in messages
+
+
+def test_config_overrides_are_memoized():
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    plain = make_article('text', settings=pelican.settings)
+    first = make_article('text', settings=pelican.settings,
+                         tableize_separator=',', tableize_th='yes')
+    second = make_article('text', settings=pelican.settings,
+                          tableize_separator=',', tableize_th='yes')
+    config = tableize.tableize_content_config(first)
+    assert tableize.tableize_content_config(plain) is \
+        tableize.tableize_config(pelican.settings)
+    assert tableize.tableize_content_config(second) is config
+    assert (config.separator, config.ai, config.th) == (',', 1, 1)
+
+    article = make_article('<tableize>\nh1,h2\nv1,v2\n</tableize>',
+                           settings=pelican.settings,
+                           tableize_separator=',', tableize_th='yes')
+    tableize.tp_content_object_init(article)
+    assert '<th class="tableize">h2</th>' in article.content
+
+
+def test_config_pickles_without_its_variants():
+    config = tableize.TableizeConfig(separator=',', workers=2)
+    config.with_overrides(('{{ ai }}', None, None, None))
+    copied = pickle.loads(pickle.dumps(config))
+    assert [getattr(copied, name) for name in tableize.TABLEIZE_CONFIG_FIELDS] == \
+        [getattr(config, name) for name in tableize.TABLEIZE_CONFIG_FIELDS]
+    assert copied.template_hash == config.template_hash
+    assert copied._variants == {}
+
+
+def test_parse_attributes_quoting():
+    attributes = tableize.tableize_parse_attributes(
+        ' caption="A b" th=1 ai=&ldquo;0&rdquo; separator=\'|\' bare')
+    assert attributes == {'caption': 'A b', 'th': '1', 'ai': '0',
+                          'separator': '|', 'bare': ''}
+
+
+def test_iter_tables_finds_blocks_and_strips_paragraph():
+    content = ('<p>intro</p>\n<p><tableize th="1">\na|b\n1|2\n</tableize></p>\n'
+               '<tableized>not a table</tableized><tableize>x</tableize>')
+    spans = list(tableize.tableize_iter_tables(content))
+    assert len(spans) == 2
+    assert content[spans[0].start:spans[0].end].startswith('<p><tableize')
+    assert content[spans[0].start:spans[0].end].endswith('</tableize></p>')
+    assert spans[0].attributes == {'th': '1'}
+    assert spans[1].body == 'x'
+
+
+def test_iter_tables_is_lazy():
+    spans = tableize.tableize_iter_tables('<tableize>a</tableize>' * 3)
+    assert next(spans).body == 'a'
+
+
+def test_iter_rows_splits_on_separator():
+    rows = tableize.tableize_iter_rows('\n a , b \n\n<p>c,d</p>\n', ',')
+    assert list(rows) == [('a', 'b'), ('c', 'd')]
+
+
+@pytest.mark.parametrize('separator', ['|', '||', ','])
+def test_iter_rows_quoted_cells_hold_separator(separator):
+    body = separator.join(['cat log', ' "grep -E a{0}b"', ' "6"" screen"',
+                           ' x"y']).format(separator) + '\n"open{0} c\nd'.format(separator)
+    assert list(tableize.tableize_iter_rows(body, separator)) == [
+        ('cat log', 'grep -E a{0}b'.format(separator), '6" screen', 'x"y'),
+        # a quote left open ends with its line
+        ('open{0} c'.format(separator),), ('d',)]
+
+
+@pytest.mark.parametrize('unit', [
+    '<tableize',                 # never terminated tag
+    '<tableize>a|b\n',           # never closed block
+    '<tableize caption="',       # unterminated attribute quote
+    '<tableizer>',               # look-alike tag
+    '<tableize>a</tableize>',    # well-formed blocks back to back
+])
+def test_iter_tables_worst_case_is_linear(unit):
+    def elapsed(repeat):
+        content = unit * repeat
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            for _span in tableize.tableize_iter_tables(content):
+                pass
+            took = time.perf_counter() - start
+            best = took if best is None else min(best, took)
+        return best
+
+    small = elapsed(20000)
+    large = elapsed(160000)
+    # 8 times the input; quadratic behaviour would take ~64 times as long
+    assert large < max(small, 1e-4) * 20
+
+
+def test_content_object_init_renders_tables():
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = make_article(
+        '<p>before</p>\n<p><tableize caption="Cap" th="1" ai="0" separator=",">\n'
+        'h1, h2\nv1, v2\n</tableize></p>\n<p>after</p>',
+        settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    html = article.content
+    assert html.startswith('<p>before</p>\n\n<div class="tableize">')
+    assert html.endswith('</div>\n<p>after</p>')
+    assert '<caption> Cap </caption>' in html
+    assert '<th class="tableize">h1</th>' in html
+    assert '<td class="tableize">v2</td>' in html
+    assert 'No.' not in html
+
+
+TABLE_ARTICLE = ('<p><tableize th="1">\nh1|h2\nv1|v2\n</tableize></p>\n'
+                 '<p><tableize caption="second">\na|b\n</tableize></p>')
+
+
+def make_cached_pelican(cache_path, **plugin_settings):
+    pelican = make_pelican(**plugin_settings)
+    pelican.settings.update(CACHE_PATH=str(cache_path), CACHE_CONTENT=True,
+                            LOAD_CONTENT_CACHE=True)
+    tableize.tableize_pelican_initialized_all(pelican)
+    return pelican
+
+
+def test_table_cache_persists_between_builds(tmp_path, monkeypatch):
+    pelican = make_cached_pelican(tmp_path)
+    first = make_article(TABLE_ARTICLE, settings=pelican.settings)
+    tableize.tp_content_object_init(first)
+    assert tableize.tp_table_cache.misses == 2
+    tableize.tableize_pelican_finalized(pelican)
+
+    # next build: every table comes from the cache, nothing is rendered
+    pelican = make_cached_pelican(tmp_path)
+    monkeypatch.setattr(tableize, 'tableize_render_table', None)
+    second = make_article(TABLE_ARTICLE, settings=pelican.settings)
+    tableize.tp_content_object_init(second)
+    assert tableize.tp_table_cache.hits == 2
+    assert second.content == first.content
+
+
+def test_table_cache_key_covers_settings_and_template(tmp_path):
+    pelican = make_cached_pelican(tmp_path)
+    tableize.tp_content_object_init(make_article(TABLE_ARTICLE, settings=pelican.settings))
+    tableize.tp_content_object_init(make_article(
+        TABLE_ARTICLE, settings=pelican.settings, tableize_template='{{ heads }}'))
+    tableize.tp_content_object_init(make_article(
+        TABLE_ARTICLE, settings=pelican.settings, tableize_ai='0'))
+    assert tableize.tp_table_cache.hits == 0
+    assert tableize.tp_table_cache.misses == 6
+
+
+def test_table_cache_ignored_without_load_policy(tmp_path):
+    pelican = make_cached_pelican(tmp_path)
+    tableize.tp_content_object_init(make_article(TABLE_ARTICLE, settings=pelican.settings))
+    tableize.tableize_pelican_finalized(pelican)
+    pelican.settings['LOAD_CONTENT_CACHE'] = False
+    tableize.tableize_pelican_initialized_all(pelican)
+    tableize.tp_content_object_init(make_article(TABLE_ARTICLE, settings=pelican.settings))
+    assert tableize.tp_table_cache.hits == 0
+
+
+def test_table_cache_invalidated_by_plugin_version(tmp_path, monkeypatch):
+    pelican = make_cached_pelican(tmp_path)
+    tableize.tp_content_object_init(make_article(TABLE_ARTICLE, settings=pelican.settings))
+    tableize.tableize_pelican_finalized(pelican)
+    monkeypatch.setattr(tableize, '__version__', '99.0.0')
+    pelican = make_cached_pelican(tmp_path)
+    assert tableize.tp_table_cache.size == 0
+    tableize.tp_content_object_init(make_article(TABLE_ARTICLE, settings=pelican.settings))
+    assert tableize.tp_table_cache.hits == 0
+
+
+def test_table_cache_evicts_least_recently_used(tmp_path):
+    cache = tableize.TableizeCache(
+        {'CACHE_PATH': str(tmp_path), 'GZIP_CACHE': False, 'CACHE_CONTENT': True,
+         'LOAD_CONTENT_CACHE': True}, max_size=10)
+    cache.cache_data('a', 'aaaa')
+    cache.cache_data('b', 'bbbb')
+    cache.get_cached_data('a')
+    cache.cache_data('c', 'cccc')
+    cache.save_cache()
+    assert cache.size == 8
+    assert cache.get_cached_data('b') is None
+    assert cache.get_cached_data('a') == 'aaaa'
+    assert cache.get_cached_data('c') == 'cccc'
+
+
+def test_identical_tables_rendered_once_per_build(monkeypatch):
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    first = make_article(TABLE_ARTICLE, settings=pelican.settings)
+    tableize.tp_content_object_init(first)
+    monkeypatch.setattr(tableize, 'tableize_render_body', None)
+    second = make_article(TABLE_ARTICLE, settings=pelican.settings)
+    tableize.tp_content_object_init(second)
+    assert second.content == first.content
+    assert (tableize.tp_table_memo.hits, tableize.tp_table_memo.misses) == (2, 2)
+
+    # another caption, template or setting is another table
+    monkeypatch.undo()
+    tableize.tp_content_object_init(make_article(
+        TABLE_ARTICLE, settings=pelican.settings, tableize_ai='0'))
+    assert tableize.tp_table_memo.misses == 4
+
+
+def test_table_memo_evicts_least_recently_used():
+    memo = tableize.TableizeMemo(max_size=10)
+    memo.put('a', 'aaaa')
+    memo.put('b', 'bbbb')
+    memo.get('a')
+    memo.put('c', 'cccc')
+    memo.put('huge', 'x' * 11)
+    assert memo.size == 8
+    assert memo.get('b') is None
+    assert memo.get('huge') is None
+    assert memo.get('a') == 'aaaa'
+    assert memo.get('c') == 'cccc'
+
+
+def make_corpus_articles(settings):
+    articles = []
+    for number in range(12):
+        rows = '\n'.join('r{0}c1 | r{0}c2 | {1}'.format(row, number)
+                         for row in range(number * 3))
+        articles.append(make_article(
+            '<p>article {0}</p>\n<p><tableize th="{1}" caption="t{0}">\n'
+            'x | y | z\n{2}\n</tableize></p>\n'
+            '<tableize ai="0" separator=",">\na,b\n</tableize>'.format(
+                number, number % 2, rows),
+            settings=settings))
+    articles.append(make_article('<p>no tables here</p>', settings=settings))
+    return articles
+
+
+def test_process_pool_output_matches_serial(tmp_path):
+    serial = make_pelican()
+    tableize.tableize_pelican_initialized_all(serial)
+    expected = make_corpus_articles(serial.settings)
+    for article in expected:
+        tableize.tp_content_object_init(article)
+
+    parallel = make_cached_pelican(tmp_path, workers=2)
+    articles = make_corpus_articles(parallel.settings)
+    for article in articles:
+        tableize.tp_content_object_init(article)
+    # nothing is rendered until the generator has read all of its articles
+    assert '<tableize' in articles[0]._content
+    tableize.tp_article_pretaxonomy(FakeGenerator(parallel.settings))
+    assert [a.content for a in articles] == [a.content for a in expected]
+    assert not tableize.tp_pending_tables
+
+    # cache hits resolved in the parent splice back in the same place
+    tableize.tableize_pelican_finalized(parallel)
+    parallel = make_cached_pelican(tmp_path, workers=2)
+    articles = make_corpus_articles(parallel.settings)
+    for article in articles:
+        tableize.tp_content_object_init(article)
+    tableize.tp_article_pretaxonomy(FakeGenerator(parallel.settings))
+    assert tableize.tp_table_cache.misses == 0
+    assert [a.content for a in articles] == [a.content for a in expected]
+
+
+def default_template():
+    return tableize.tableize_get_template(
+        tableize.DEFAULT_TABLEIZE_PLUGIN_PELICAN_CONFIG_TEMPLATE)
+
+
+def make_body(rows, separator='|'):
+    return '\n'.join(separator.join(('cell %d' % row, 'value %d' % row, 'x'))
+                     for row in range(rows))
+
+
+def test_streaming_render_matches_render():
+    body = make_body(500)
+    expected = tableize.tableize_render_body(default_template(), body, '|', 1, 1, 'c')
+    streamed = tableize.tableize_render_body(default_template(), body, '|', 1, 1, 'c',
+                                             stream_threshold=100)
+    assert streamed == expected
+
+
+def test_streaming_used_above_threshold(monkeypatch):
+    calls = []
+    stream_table = tableize.tableize_stream_table
+
+    def spy(*args, **kwargs):
+        calls.append(args)
+        return stream_table(*args, **kwargs)
+
+    monkeypatch.setattr(tableize, 'tableize_stream_table', spy)
+    tableize.tableize_render_body(default_template(), make_body(100), '|', 1, 0, None,
+                                  stream_threshold=100)
+    assert not calls
+    tableize.tableize_render_body(default_template(), make_body(102), '|', 1, 0, None,
+                                  stream_threshold=100)
+    assert len(calls) == 1
+
+
+class CountingOutput:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+
+
+def test_streaming_memory_does_not_grow_with_rows():
+    template = default_template()
+
+    def peak(rows):
+        body = make_body(rows)
+        output = CountingOutput()
+        tracemalloc.start()
+        tableize.tableize_stream_table(template, (), tableize.tableize_iter_rows(body, '|'),
+                                       output=output)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert output.size > rows * 100
+        return peak
+
+    # warm up the template, and CPython's tuple free list: each row builds
+    # a temporary tuple, and up to 2000 freed ones stay allocated there
+    peak(20000)
+    large = peak(20000)
+    assert large < 256 * 1024
+    assert large < peak(2000) * 2 + 64 * 1024
+
+
+def test_table_model_has_no_instance_dict():
+    table = tableize.Table(['a'], [tableize.Row(('1',))])
+    assert not hasattr(table, '__dict__')
+    assert not hasattr(table.bodies[0], '__dict__')
+    assert table.heads == ('a',)
+
+
+def test_table_heads_are_interned():
+    first = tableize.Table([''.join(['Ver', 'sion'])])
+    second = tableize.Table([''.join(['Vers', 'ion'])])
+    assert first.heads[0] is second.heads[0]
+
+
+def test_table_model_memory_against_plain_lists():
+    body = make_body(20000)
+
+    def allocated(build):
+        tracemalloc.start()
+        rows = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(rows) == 20000
+        return size
+
+    as_lists = allocated(lambda: [[cell.strip() for cell in line.split('|')]
+                                  for line in body.splitlines()])
+    as_rows = allocated(lambda: list(tableize.tableize_iter_rows(body, '|')))
+    # same cell strings either way; a Row costs a bare tuple, less than a list
+    assert as_rows < as_lists
+
+
+def test_iter_file_rows_parses_csv_lazily(tmp_path):
+    data = tmp_path / 'data.csv'
+    data.write_bytes(b'name,notes\r\n"a, b",x < y\r\n\r\nc,"say ""hi"""\r\n')
+    rows = tableize.tableize_iter_file_rows(str(data), ',')
+    assert next(rows) == ('name', 'notes')
+    assert list(rows) == [('a, b', 'x &lt; y'), ('c', 'say "hi"')]
+    empty = tmp_path / 'empty.csv'
+    empty.write_bytes(b'')
+    assert list(tableize.tableize_iter_file_rows(str(empty), ',')) == []
+
+
+def test_src_attribute_renders_data_file(tmp_path):
+    (tmp_path / 'posts').mkdir()
+    (tmp_path / 'posts' / 'data.tsv').write_text('h1\th2\nv1\tv2\n')
+    pelican = make_pelican()
+    pelican.settings['PATH'] = str(tmp_path)
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = Article('<tableize src="data.tsv" separator="\\t" th="1"></tableize>',
+                      metadata={'title': 't', 'date': datetime(2024, 1, 1),
+                                'category': 'c'},
+                      settings=pelican.settings,
+                      source_path=str(tmp_path / 'posts' / 'article.md'))
+    tableize.tp_content_object_init(article)
+    assert '<th class="tableize">h2</th>' in article.content
+    assert '<td class="tableize">v2</td>' in article.content
+
+
+def test_src_attribute_missing_file_keeps_inline_rows(tmp_path):
+    pelican = make_pelican()
+    pelican.settings['PATH'] = str(tmp_path)
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = make_article('<tableize src="missing.csv">\na|b\n</tableize>',
+                           settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    assert '<td class="tableize">b</td>' in article.content
+
+
+def test_src_table_cache_follows_data_file(tmp_path):
+    data = tmp_path / 'data.csv'
+    data.write_text('a,b\n')
+    pelican = make_cached_pelican(tmp_path / 'cache', memo_size=0)
+    pelican.settings['PATH'] = str(tmp_path)
+    content = '<tableize src="data.csv" separator=","></tableize>'
+    tableize.tp_content_object_init(make_article(content, settings=pelican.settings))
+    tableize.tp_content_object_init(make_article(content, settings=pelican.settings))
+    assert tableize.tp_table_cache.hits == 1
+    data.write_text('a,b\nc,d\n')
+    os.utime(data, ns=(1, 1))
+    article = make_article(content, settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    assert tableize.tp_table_cache.misses == 2
+    assert '<td class="tableize">d</td>' in article.content
+
+
+def test_src_data_files_prefetched_for_generator(tmp_path, monkeypatch):
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'releases.csv').write_text('v,year\n1.0,2023\n')
+    (tmp_path / 'posts').mkdir()
+    content = '<tableize src="data/releases.csv" separator="," th="1"></tableize>'
+    source = tmp_path / 'posts' / 'article.md'
+    source.write_text('Title: t\n\n' + content + '\n')
+    (tmp_path / 'posts' / 'plain.md').write_text('Title: p\n\nno tables\n')
+    pelican = make_pelican(prefetch_workers=4)
+    pelican.settings['PATH'] = str(tmp_path)
+    tableize.tableize_pelican_initialized_all(pelican)
+    generator = FakeGenerator(pelican.settings)
+    tableize.tp_article_preread(generator)
+    prefetch = tableize.tp_prefetch
+    tableize.tp_article_preread(generator)
+    assert tableize.tp_prefetch is prefetch
+    # let every lookup and load finish before hiding the file accesses
+    prefetch.close()
+
+    # rendered from the bytes prefetched, without touching the file
+    monkeypatch.setitem(sys.modules, 'mmap', None)
+    monkeypatch.setattr(tableize, 'tableize_find_source', None)
+    article = make_article(content, settings=pelican.settings, source_path=str(source))
+    tableize.tp_content_object_init(article)
+    assert '<th class="tableize">year</th>' in article.content
+    assert '<td class="tableize">2023</td>' in article.content
+    tableize.tp_article_pretaxonomy(generator)
+    assert tableize.tp_prefetch is None
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize('window_size, read_ahead', [(1000, 2), (150, 1)])
+def test_prefetch_reads_ahead_within_window(tmp_path, monkeypatch, window_size,
+                                            read_ahead):
+    monkeypatch.setattr(tableize, 'TABLEIZE_PREFETCH_WINDOW_FILES', 2)
+    monkeypatch.setattr(tableize, 'TABLEIZE_PREFETCH_WINDOW_SIZE', window_size)
+    data_files = []
+    for number in range(6):
+        (tmp_path / ('a%d.md' % number)).write_text(
+            '<tableize src="d{0}.csv"></tableize>\n'.format(number))
+        data_files.append(str(tmp_path / ('d%d.csv' % number)))
+        (tmp_path / ('d%d.csv' % number)).write_bytes(b'%d' % number * 100)
+    pelican = make_pelican(prefetch_workers=2)
+    pelican.settings['PATH'] = str(tmp_path)
+    prefetch = tableize.tableize_prefetch_generator(
+        FakeGenerator(pelican.settings), 2, 'ARTICLE_PATHS', 'ARTICLE_EXCLUDES')
+    try:
+        # the articles are read in order, each data file handed over once
+        for number, data_file in enumerate(data_files):
+            wait_for(lambda: data_file in prefetch._files)
+            assert prefetch._held_files <= 2
+            assert sum(data is not None for data in prefetch._data.values()) <= read_ahead
+            assert prefetch._held_size <= window_size
+            assert prefetch.stamp(data_file) is not None
+            data = prefetch.data(data_file)
+            # with room for one file, the next one is read as usual
+            assert data == b'%d' % number * 100 or (read_ahead == 1 and data is None)
+            assert prefetch.data(data_file) is None
+    finally:
+        prefetch.close()
+    assert (prefetch._data, prefetch._held_files, prefetch._held_size) == ({}, 0, 0)
+
+
+def test_page_tables_rendered_on_process_pool():
+    def make_page(settings):
+        return Page(TABLE_ARTICLE, metadata={'title': 'Page'}, settings=settings,
+                    source_path='page.md')
+
+    serial = make_pelican(markdown=False)
+    tableize.tableize_pelican_initialized_all(serial)
+    expected = make_page(serial.settings)
+    tableize.tp_content_object_init(expected)
+
+    parallel = make_pelican(markdown=False, workers=2)
+    tableize.tableize_pelican_initialized_all(parallel)
+    page = make_page(parallel.settings)
+    tableize.tp_content_object_init(page)
+    tableize.tp_page_finalized(FakeGenerator(parallel.settings))
+    assert page.content == expected.content
+    assert not tableize.tp_pending_tables
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_pages_get_same_tables_as_articles(tmp_path, workers):
+    content = '<tableize>\n' + make_body(50) + '</tableize>\ntext\n<tableize>\na|b\n</tableize>'
+    pelican = make_pelican(markdown=False, workers=workers, fragment_threshold=1000)
+    pelican.settings['OUTPUT_PATH'] = str(tmp_path)
+    tableize.tableize_pelican_initialized_all(pelican)
+    articles_generator = FakeGenerator(pelican.settings)
+    pages_generator = FakeGenerator(pelican.settings)
+    articles_generator.output_path = pages_generator.output_path = str(tmp_path)
+    article = make_article(content, settings=pelican.settings, source_path='post.md')
+    page = Page(content, metadata={'title': 'Page'}, settings=pelican.settings,
+                source_path='page.md')
+
+    # as Pelican.run() does, every generator is created before any reads
+    tableize.tp_article_init(articles_generator)
+    tableize.tp_page_init(pages_generator)
+    tableize.tp_article_preread(articles_generator)
+    tableize.tp_content_object_init(article)
+    tableize.tp_article_pretaxonomy(articles_generator)
+    tableize.tp_article_finalized(articles_generator)
+    tableize.tp_page_preread(pages_generator)
+    tableize.tp_content_object_init(page)
+    tableize.tp_page_finalized(pages_generator)
+    assert tableize.tp_current_index is None
+    assert page.content == article.content
+    assert tableize.tableize_generator_index(articles_generator) == \
+        {'post.md': article._tableize_offsets}
+    assert tableize.tableize_generator_index(pages_generator) == \
+        {'page.md': page._tableize_offsets}
+
+    # the huge table goes into the same fragment file
+    tableize.tp_article_write(articles_generator, content=article)
+    tableize.tp_page_write(pages_generator, content=page)
+    assert 'tableize-fragment' in page.content
+    assert page.content == article.content
+    assert len(list((tmp_path / 'tableize').glob('*.html'))) == 1
+
+
+def test_tables_left_queued_rendered_when_all_generators_finalized():
+    pelican = make_pelican(markdown=False, workers=2)
+    tableize.tableize_pelican_initialized_all(pelican)
+    # e.g., read by the generator of another plugin
+    article = make_article(TABLE_ARTICLE, settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    assert tableize.tp_pending_tables
+    tableize.tp_all_generators_finalized([])
+    assert not tableize.tp_pending_tables
+    assert '<td class="tableize">' in article.content
+
+
+def test_src_table_on_process_pool(tmp_path):
+    (tmp_path / 'data.csv').write_text('a,b\nc,d\n')
+    pelican = make_pelican(workers=2)
+    pelican.settings['PATH'] = str(tmp_path)
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = make_article('<tableize src="data.csv" separator=","></tableize>',
+                           settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    tableize.tp_article_pretaxonomy(FakeGenerator(pelican.settings))
+    assert '<td class="tableize">d</td>' in article.content
+
+
+def test_stats_count_table_work_serial_and_on_process_pool(tmp_path):
+    counters = []
+    for pelican in (make_pelican(), make_pelican(workers=2)):
+        tableize.tableize_pelican_initialized_all(pelican)
+        for article in make_corpus_articles(pelican.settings):
+            tableize.tp_content_object_init(article)
+        tableize.tp_article_pretaxonomy(FakeGenerator(pelican.settings))
+        tableize.tableize_pelican_finalized(pelican)
+        counters.append(tableize.tp_stats.as_dict())
+        del counters[-1]['handler_seconds'], counters[-1]['handler_calls']
+    serial, parallel = counters
+    assert serial['tables'] == 24
+    # the 12 copies of the 'a,b' table are rendered once
+    assert serial['memo_hits'] == 11
+    assert serial['memo_misses'] == 13
+    assert serial['rows'] == sum(number * 3 + 1 for number in range(12)) + 1
+    assert serial['cells'] == serial['rows'] * 3 - 1
+    assert serial['bytes_out'] > serial['bytes_in'] > 0
+    assert parallel == serial
+
+
+def test_timed_handlers_are_created_once():
+    wrapper = tableize.tableize_timed(tableize.tp_article_pretaxonomy)
+    assert tableize.tableize_timed(tableize.tp_article_pretaxonomy) is wrapper
+    assert wrapper.__name__ == 'tp_article_pretaxonomy'
+    wrapper(FakeGenerator(make_pelican().settings))
+    wrapper(FakeGenerator(make_pelican().settings))
+    assert tableize.tp_stats.handler_calls['tp_article_pretaxonomy'] == 2
+    assert tableize.tp_stats.handler_seconds['tp_article_pretaxonomy'] >= 0.0
+
+
+def test_stats_summary_logged_and_written_at_finalized(tmp_path, caplog):
+    stats_file = tmp_path / 'stats.json'
+    pelican = make_pelican(stats_file=str(stats_file))
+    tableize.tableize_timed(tableize.tableize_pelican_initialized_all)(pelican)
+    tableize.tp_content_object_init(make_article(TABLE_ARTICLE, settings=pelican.settings))
+    with caplog.at_level('INFO', logger=tableize.__name__):
+        tableize.tableize_pelican_finalized(pelican)
+    assert 'tableize: 2 tables, 3 rows, 6 cells' in caplog.text
+    assert 'tableize_pelican_initialized_all' in caplog.text
+    stats = json.loads(stats_file.read_text())
+    assert stats['tables'] == 2
+    assert stats['handler_calls'] == {'tableize_pelican_initialized_all': 1}
+
+
+def test_content_without_tables_is_not_parsed(monkeypatch):
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    monkeypatch.setattr(tableize, 'tableize_iter_tables', None)
+    monkeypatch.setattr(tableize, 'tableize_content_config', None)
+    article = make_article('<p>no tables, not even a &lt;tableize&gt;</p>',
+                           settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    assert article.content == '<p>no tables, not even a &lt;tableize&gt;</p>'
+
+
+def test_generator_index_records_table_offsets(tmp_path):
+    for workers in (0, 2):
+        pelican = make_pelican(workers=workers)
+        tableize.tableize_pelican_initialized_all(pelican)
+        generator = FakeGenerator(pelican.settings)
+        tableize.tp_article_init(generator)
+        tableize.tp_article_preread(generator)
+        with_tables = make_article(TABLE_ARTICLE, settings=pelican.settings)
+        without = make_article('<p>plain</p>', settings=pelican.settings)
+        for article in (with_tables, without):
+            tableize.tp_content_object_init(article)
+        tableize.tp_article_pretaxonomy(generator)
+        tableize.tp_article_finalized(generator)
+        assert tableize.tp_current_index is None
+
+        index = tableize.tableize_generator_index(generator)
+        assert list(index) == ['tables.md']
+        offsets = index['tables.md']
+        assert len(offsets) == 2
+        content = with_tables.content
+        for start, end in offsets:
+            assert content[start:].startswith('\n<div class="tableize">')
+            assert content[:end].endswith('</div>')
+
+
+def test_generator_index_covers_cached_articles():
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = make_article(TABLE_ARTICLE, settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    # as if restored from Pelican's content cache by the next build
+    restored = pickle.loads(pickle.dumps(article))
+    tableize.tableize_pelican_initialized_all(pelican)
+    generator = FakeGenerator(pelican.settings, [restored])
+    tableize.tp_article_init(generator)
+    tableize.tp_article_preread(generator)
+    tableize.tp_article_pretaxonomy(generator)
+    assert tableize.tableize_generator_index(generator) == \
+        {'tables.md': article._tableize_offsets}
+
+
+def build_with_dependencies(tmp_path, **plugin_settings):
+    """ Initialize a cached build over the articles in `tmp_path`, let a
+        generator whose content cache holds all of them drop the stale ones,
+        render the articles again, and return what the generator dropped."""
+    pelican = make_cached_pelican(tmp_path / 'cache', **plugin_settings)
+    pelican.settings['PATH'] = str(tmp_path)
+    generator = FakeGenerator(pelican.settings)
+    generator._cache = {'./' + path.name: 'cached' for path in tmp_path.glob('*.md')}
+    tableize.tp_article_init(generator)
+    tableize.tp_article_preread(generator)
+    for path in sorted(tmp_path.glob('*.md')):
+        content, _, template = path.read_text().partition('\n')
+        metadata = {'tableize_template': template} if template else {}
+        tableize.tp_content_object_init(make_article(
+            content, settings=pelican.settings, source_path=str(path), **metadata))
+    tableize.tableize_pelican_finalized(pelican)
+    return sorted(name for name in ['./' + path.name for path in tmp_path.glob('*.md')]
+                  if name not in generator._cache)
+
+
+def test_dependencies_drop_only_affected_articles(tmp_path):
+    (tmp_path / 'site.md').write_text('<tableize>a|b</tableize>')
+    (tmp_path / 'own.md').write_text('<tableize>a|b</tableize>\n<b>{{ bodies }}</b>')
+    (tmp_path / 'data.md').write_text('<tableize src="d.csv" separator=","></tableize>')
+    (tmp_path / 'plain.md').write_text('<p>no tables</p>')
+    data = tmp_path / 'd.csv'
+    data.write_text('a,b\n')
+
+    assert build_with_dependencies(tmp_path) == []
+    assert build_with_dependencies(tmp_path) == []
+    # the site template: all but the article with its own template
+    assert build_with_dependencies(tmp_path, template='<i>{{ bodies }}</i>') == \
+        ['./data.md', './site.md']
+    assert build_with_dependencies(tmp_path, template='<i>{{ bodies }}</i>') == []
+    # a data file
+    data.write_text('a,b\nc,d\n')
+    os.utime(data, ns=(1, 1))
+    assert build_with_dependencies(tmp_path, template='<i>{{ bodies }}</i>') == \
+        ['./data.md']
+    # a setting shared by every template
+    assert build_with_dependencies(tmp_path, template='<i>{{ bodies }}</i>', ai=0) == \
+        ['./data.md', './own.md', './site.md']
+
+
+def test_dependencies_drop_stale_pages(tmp_path):
+    (tmp_path / 'page.md').write_text('<tableize>a|b</tableize>')
+    (tmp_path / 'own.md').write_text('<tableize>a|b</tableize>\n<b>{{ bodies }}</b>')
+    build_with_dependencies(tmp_path)
+    pelican = make_cached_pelican(tmp_path / 'cache', template='<i>{{ bodies }}</i>')
+    pelican.settings['PATH'] = str(tmp_path)
+    pages_generator = FakeGenerator(pelican.settings)
+    pages_generator._cache = {'./page.md': 'cached', './own.md': 'cached'}
+    tableize.tp_page_init(pages_generator)
+    tableize.tp_page_preread(pages_generator)
+    assert list(pages_generator._cache) == ['./own.md']
+
+
+def test_dependencies_forget_deleted_articles(tmp_path):
+    (tmp_path / 'site.md').write_text('<tableize>a|b</tableize>')
+    build_with_dependencies(tmp_path)
+    (tmp_path / 'site.md').unlink()
+    build_with_dependencies(tmp_path)
+    dependencies = tableize.TableizeDependencies(
+        make_cached_pelican(tmp_path / 'cache').settings)
+    assert list(dependencies._cache) == [tableize.TABLEIZE_CACHE_VERSION_KEY]
+
+
+def test_reader_renders_table_source_file(tmp_path):
+    source = tmp_path / 'releases.tbl'
+    source.write_text('Title: Releases\nDate: 2024-01-01\n'
+                      'tableize_caption: Release matrix\n'
+                      'tableize_separator: ,\ntableize_th: yes\n\n'
+                      'Version, Released\n"1.0, final", 2023\n\n2.0, <2024>\n')
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    reader = tableize.TableizeReader(pelican.settings)
+    content, metadata = reader.read(str(source))
+    assert metadata['title'] == 'Releases'
+    assert metadata['date'] == datetime(2024, 1, 1)
+    assert '<caption> Release matrix </caption>' in content
+    assert '<th class="tableize">Released</th>' in content
+    assert '<td class="tableize">1.0, final</td>' in content
+    assert '<td class="tableize">&lt;2024&gt;</td>' in content
+    assert content.count('<tr class="tableize">') == 3
+    assert tableize.tp_stats.tables == 1
+
+
+
+def test_table_source_file_is_indexed(tmp_path):
+    source = tmp_path / 'big.tbl'
+    source.write_text('Title: Big\nDate: 2024-01-01\n\n' + make_body(50, ','))
+    pelican = make_pelican(separator=',')
+    tableize.tableize_pelican_initialized_all(pelican)
+    content, metadata = tableize.TableizeReader(pelican.settings).read(str(source))
+    article = make_article(content, settings=pelican.settings, source_path=str(source),
+                           **metadata)
+    generator = FakeGenerator(pelican.settings)
+    tableize.tp_article_init(generator)
+    tableize.tp_article_preread(generator)
+    tableize.tp_content_object_init(article)
+    assert article._tableize_offsets == ((0, len(content)),)
+    assert tableize.tableize_generator_index(generator) == \
+        {str(source): article._tableize_offsets}
+
+def test_reader_without_metadata(tmp_path):
+    source = tmp_path / 'bare.tbl'
+    source.write_text('a|b\nc|d\n')
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    content, metadata = tableize.TableizeReader(pelican.settings).read(str(source))
+    assert metadata == {}
+    assert content.count('<tr class="tableize">') == 2
+    assert '<td class="tableize">a</td>' in content
+
+
+def test_reader_is_registered_for_tbl_files():
+    settings = deepcopy(DEFAULT_CONFIG)
+    assert Readers(settings).reader_classes['tbl'] is tableize.TableizeReader
+    settings['READERS'] = {'tbl': None}
+    assert 'tbl' not in Readers(settings).readers
+
+
+MARKDOWN_ARTICLE = """Title: Tables
+tableize_th: yes
+
+Intro "quoted" text.
+
+<tableize caption="Don't panic" separator=",">
+h1, h2
+say "a", b
+
+c, d
+</tableize>
+
+<tableize src="data.csv" separator=","></tableize>
+"""
+
+
+def read_markdown(tmp_path, **plugin_settings):
+    (tmp_path / 'article.md').write_text(MARKDOWN_ARTICLE)
+    (tmp_path / 'data.csv').write_text('x,y\n')
+    pelican = make_pelican(**plugin_settings)
+    pelican.settings['PATH'] = str(tmp_path)
+    pelican.settings['MARKDOWN']['extension_configs']['markdown.extensions.smarty'] = {}
+    tableize.tableize_pelican_initialized_all(pelican)
+    content, metadata = MarkdownReader(pelican.settings).read(str(tmp_path / 'article.md'))
+    return make_article(content, settings=pelican.settings,
+                        source_path=str(tmp_path / 'article.md'), **metadata)
+
+
+def test_markdown_extension_renders_tables_during_parse(tmp_path):
+    article = read_markdown(tmp_path)
+    content = article._content
+    # smarty got the text, but never the table source
+    assert '&ldquo;quoted&rdquo;' in content
+    assert "<caption> Don't panic </caption>" in content
+    assert '<td class="tableize">say "a"</td>' in content
+    assert '<th class="tableize">h2</th>' in content
+    assert '<p>\n<div' not in content
+    assert len(tableize.tp_markdown_tables) == 1
+    assert tableize.tp_stats.tables == 1
+
+    # the `src` block is left for tp_content_object_init()
+    assert '<tableize src="data.csv" separator=","></tableize>' in content
+    tableize.tp_content_object_init(article)
+    assert not tableize.tp_markdown_tables
+    assert '<th class="tableize">y</th>' in article.content
+    assert tableize.tp_stats.tables == 2
+    offsets = article._tableize_offsets
+    assert len(offsets) == 2
+    for start, end in offsets:
+        assert article.content[start:].startswith('\n<div class="tableize">')
+        assert article.content[:end].endswith('</div>')
+
+
+def test_markdown_extension_can_be_turned_off(tmp_path, caplog):
+    with caplog.at_level('WARNING', logger=tableize.__name__):
+        article = read_markdown(tmp_path, markdown=False)
+    assert 'smarty' in caplog.text
+    assert not any(isinstance(extension, tableize.TableizeExtension)
+                   for extension in article.settings['MARKDOWN']['extensions'])
+    assert 'say &ldquo;a&rdquo;, b</p>' in article._content
+    tableize.tp_content_object_init(article)
+    assert '<td class="tableize">say &ldquo;a&rdquo;</td>' in article.content
+
+
+def test_markdown_table_offsets_at_start_of_article(tmp_path):
+    source = tmp_path / 'first.md'
+    source.write_text('Title: t\n\n<tableize>\na|b\n</tableize>\n\ntext\n\n'
+                      '<tableize src="data.csv" separator=","></tableize>\n\n'
+                      '<tableize>\nc|d\n</tableize>\n')
+    (tmp_path / 'data.csv').write_text('x,y\nz,w\n')
+    pelican = make_pelican()
+    pelican.settings['PATH'] = str(tmp_path)
+    tableize.tableize_pelican_initialized_all(pelican)
+    content, metadata = MarkdownReader(pelican.settings).read(str(source))
+    article = make_article(content, settings=pelican.settings, source_path=str(source),
+                           **metadata)
+    tableize.tp_content_object_init(article)
+    assert '\x0e' not in article.content
+    offsets = article._tableize_offsets
+    assert len(offsets) == 3
+    assert offsets[0][0] == 0
+    for start, end in offsets:
+        assert article.content[start:].startswith('\n<div class="tableize">')
+        assert article.content[:end].endswith('</div>')
+
+
+def test_markdown_tables_same_on_process_pool(tmp_path):
+    contents = []
+    for workers in (0, 2):
+        article = read_markdown(tmp_path, workers=workers)
+        tableize.tp_content_object_init(article)
+        tableize.tp_article_pretaxonomy(FakeGenerator(article.settings))
+        contents.append(article.content)
+    assert contents[0] == contents[1]
+
+
+INLINE_ARTICLE = """Title: Inline
+
+<tableize th="no">
+**bold** | [link](https://example.org/) | `code` | say "quoted"
+*open | close* | yes | a < b
+</tableize>
+"""
+
+
+def test_cell_inline_markdown_rendered(tmp_path):
+    (tmp_path / 'inline.md').write_text(INLINE_ARTICLE)
+    contents = []
+    for workers in (0, 2):
+        pelican = make_pelican(inline_markdown=True, workers=workers)
+        pelican.settings['PATH'] = str(tmp_path)
+        pelican.settings['MARKDOWN']['extension_configs']['markdown.extensions.smarty'] = {}
+        tableize.tableize_pelican_initialized_all(pelican)
+        content, metadata = MarkdownReader(pelican.settings).read(
+            str(tmp_path / 'inline.md'))
+        article = make_article(content, settings=pelican.settings, reader='markdown',
+                               source_path=str(tmp_path / 'inline.md'), **metadata)
+        tableize.tp_content_object_init(article)
+        tableize.tp_article_pretaxonomy(FakeGenerator(pelican.settings))
+        contents.append(article.content)
+    assert contents[0] == contents[1]
+    content = contents[0]
+    assert '<td class="tableize"><strong>bold</strong></td>' in content
+    assert '<td class="tableize"><a href="https://example.org/">link</a></td>' in content
+    assert '<td class="tableize"><code>code</code></td>' in content
+    # no smarty, and no emphasis from one cell into the next
+    assert '<td class="tableize">say "quoted"</td>' in content
+    assert '<td class="tableize">*open</td>' in content
+    assert '<td class="tableize">a &lt; b</td>' in content
+
+
+def test_cell_inline_markdown_cached_by_text():
+    batches = []
+
+    class Counting(tableize.TableizeInlineMarkdown):
+        __slots__ = ()
+
+        def render(self, texts):
+            batches.append(texts)
+            return super().render(texts)
+
+    inline = Counting(max_size=2)
+    rows = [tableize.Row(('*a*', 'yes', '_b_')), tableize.Row(('*a*', 'n/a', '_b_'))]
+    assert list(inline.iter_rows(rows)) == [('<em>a</em>', 'yes', '<em>b</em>'),
+                                            ('<em>a</em>', 'n/a', '<em>b</em>')]
+    # one batch, each distinct marked-up text once
+    assert batches == [['*a*', '_b_']]
+    assert inline.convert(['_b_', '*c*']) == ['<em>b</em>', '<em>c</em>']
+    assert batches[1:] == [['*c*']]
+    # '*a*' was the least recently used
+    assert inline.convert(['*a*']) == ['<em>a</em>']
+    assert batches[2:] == [['*a*']]
+
+
+def test_markdown_extension_passes_tables_through_when_rendered_later():
+    for settings in ({'TABLEIZE_PLUGIN': {'workers': 2}},
+                     {'CACHE_CONTENT': True, 'CONTENT_CACHING_LAYER': 'reader'}):
+        pelican = make_pelican()
+        pelican.settings.update(settings)
+        tableize.tableize_pelican_initialized_all(pelican)
+        extension, = [extension for extension in pelican.settings['MARKDOWN']['extensions']
+                      if isinstance(extension, tableize.TableizeExtension)]
+        assert not extension.render
+    pelican.settings['CONTENT_CACHING_LAYER'] = 'generator'
+    tableize.tableize_pelican_initialized_all(pelican)
+    extension, = [extension for extension in pelican.settings['MARKDOWN']['extensions']
+                  if isinstance(extension, tableize.TableizeExtension)]
+    assert extension.render
+
+
+def test_markdown_extension_is_replaced_between_builds():
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    tableize.tableize_pelican_initialized_all(pelican)
+    extensions = [extension for extension in pelican.settings['MARKDOWN']['extensions']
+                  if isinstance(extension, tableize.TableizeExtension)]
+    assert len(extensions) == 1
+    assert extensions[0].tableize_config is tableize.tableize_config(pelican.settings)
+
+
+GOLDEN_TABLES = [
+    dict(heads=('a', 'b'), bodies=[('1', '2'), ('3', '4')], caption='cap', ai=1, th=1),
+    dict(heads=('a', 'b'), bodies=[('1', '2'), ()], caption=None, ai=0, th=1),
+    dict(heads=(), bodies=[('x <b>y</b>', '&amp;', '')], caption='', ai=1, th=0),
+    dict(heads=('only',), bodies=[], caption='Cap & co', ai=0, th=0),
+    dict(heads=(), bodies=[], caption=None, ai=True, th=True),
+    dict(heads=('1', 'None'), bodies=[(2.5, None)], caption=0, ai=False, th=False),
+    dict(heads=('h',), bodies=[('v',)] * 3, caption='c', ai=2, th=None),
+]
+
+
+@pytest.mark.parametrize('table', GOLDEN_TABLES)
+def test_fast_engine_matches_jinja(table):
+    jinja = default_template()
+    fast = tableize.tp_fast_template
+    assert fast.render(table) == jinja.render(table)
+    assert fast.render(**table) == jinja.render(**table)
+    output = CountingOutput()
+    tableize.Table(**table).stream(fast, output)
+    assert tableize.Table(**table).stream(fast) == jinja.render(table)
+    assert output.size == len(jinja.render(table))
+
+
+@pytest.mark.parametrize('th', [0, 1])
+@pytest.mark.parametrize('ai', [0, 1])
+def test_fast_engine_matches_jinja_on_rendered_bodies(ai, th):
+    body = make_body(300, ',') + '\n\n<p>last, row</p>\n'
+    expected = tableize.tableize_render_body(default_template(), body, ',', ai, th, 'c')
+    fast = tableize.tp_fast_template
+    assert tableize.tableize_render_body(fast, body, ',', ai, th, 'c') == expected
+    assert tableize.tableize_render_body(fast, body, ',', ai, th, 'c',
+                                         stream_threshold=10) == expected
+
+
+def test_engine_selects_fast_template_for_default_template_only():
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    config = tableize.tableize_config(pelican.settings)
+    assert tableize.tableize_config_template(config) is tableize.tp_fast_template
+    assert not tableize.tp_template_cache
+    custom = config.with_overrides(('<i>{{ caption }}</i>', None, None, None))
+    assert tableize.tableize_config_template(custom).render(caption='x') == '<i>x</i>'
+    jinja = tableize.TableizeConfig(engine='jinja')
+    assert tableize.tableize_config_template(jinja) is not tableize.tp_fast_template
+
+    outputs = []
+    for engine in ('fast', 'jinja'):
+        pelican = make_pelican(engine=engine)
+        tableize.tableize_pelican_initialized_all(pelican)
+        article = make_article(TABLE_ARTICLE, settings=pelican.settings)
+        tableize.tp_content_object_init(article)
+        outputs.append(article.content)
+    assert outputs[0] == outputs[1]
+
+
+def test_write_moves_huge_tables_into_fragment_files(tmp_path):
+    content = ('<tableize>\n{0}\n</tableize>\n<p>between</p>\n'
+               '<tableize>\na|b\n</tableize>'.format(make_body(100)))
+
+    def build():
+        pelican = make_pelican(fragment_threshold=1000)
+        tableize.tableize_pelican_initialized_all(pelican)
+        generator = FakeGenerator(pelican.settings)
+        generator.output_path = str(tmp_path)
+        tableize.tp_article_init(generator)
+        tableize.tp_article_preread(generator)
+        articles = [make_article(content, settings=pelican.settings, source_path=name)
+                    for name in ('en.md', 'fr.md')]
+        for article in articles:
+            tableize.tp_content_object_init(article)
+        tableize.tp_article_pretaxonomy(generator)
+        return generator, articles
+
+    generator, (first, second) = build()
+    full = first.content  # memoized by Pelican before the write
+    table_start, table_end = first._tableize_offsets[0]
+    table = full[table_start:table_end]
+    tableize.tp_article_write(generator, content=first)
+    fragments = list((tmp_path / 'tableize').iterdir())
+    assert [path.read_text() for path in fragments] == [table]
+    url = '/tableize/' + fragments[0].name
+    assert '<div class="tableize-fragment" data-tableize-src="{0}">'.format(url) \
+        in first.content
+    assert first.content.endswith(tableize.TABLEIZE_FRAGMENT_LOADER)
+    assert '<p>between</p>' in first.content
+    assert len(first.content) < len(table)
+    # the small table stays inline, where the index now says
+    start, end = tableize.tableize_generator_index(generator)['en.md'][1]
+    assert first.content[start:end].startswith('\n<div class="tableize">')
+    assert first.content[:end].endswith('</div>')
+
+    # a translation sharing the table, and the next build, do not rewrite it
+    os.utime(fragments[0], ns=(1, 1))
+    tableize.tp_article_write(generator, content=second)
+    assert url in second.content
+    generator, (first, second) = build()
+    tableize.tp_article_write(generator, content=first)
+    assert fragments[0].stat().st_mtime_ns == 1
+
+
+def test_write_keeps_tables_inline_by_default(tmp_path):
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    generator = FakeGenerator(pelican.settings)
+    generator.output_path = str(tmp_path)
+    tableize.tp_article_init(generator)
+    tableize.tp_article_preread(generator)
+    article = make_article('<tableize>\n{0}\n</tableize>'.format(make_body(1000)),
+                           settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    content = article.content
+    tableize.tp_article_write(generator, content=article)
+    assert article.content == content
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize('table', GOLDEN_TABLES)
+def test_minified_fast_engine_matches_jinja(table):
+    jinja = tableize.tableize_get_template(tableize.TABLEIZE_MINIFIED_TEMPLATE)
+    assert tableize.tp_fast_minified_template.render(table) == jinja.render(table)
+
+
+def test_minify_drops_repeated_attributes_and_whitespace():
+    outputs = {}
+    for minify in (False, True):
+        pelican = make_pelican(minify=minify, th=True)
+        tableize.tableize_pelican_initialized_all(pelican)
+        article = make_article('<tableize caption="c">\n{0}\n</tableize>'.format(
+            make_body(200)), settings=pelican.settings)
+        tableize.tp_content_object_init(article)
+        outputs[minify] = article.content
+    minified = outputs[True]
+    assert minified.startswith('<div class="tableize"><table><caption>c</caption>')
+    assert '<tr><td>1</td><td>cell 1</td><td>value 1</td><td>x</td></tr><tr>' in minified
+    assert minified.count('class=') == 1
+    assert '\n' not in minified
+    assert len(minified) * 2 < len(outputs[False])
+
+    # a template of one's own is left alone
+    config = tableize.TableizeConfig(minify=True, template_source='{{ ai }}')
+    assert config.template_source == '{{ ai }}'
+
+
+def test_precompress_writes_sidecars_of_pages_with_large_tables(tmp_path):
+    pelican = make_pelican(precompress='gz', precompress_threshold=10000)
+    tableize.tableize_pelican_initialized_all(pelican)
+    small = make_article('<tableize>\na|b\n</tableize>', settings=pelican.settings)
+    large = make_article('<tableize>\n{0}\n</tableize>'.format(make_body(500)),
+                         settings=pelican.settings)
+    for name, article in (('small.html', small), ('large.html', large)):
+        tableize.tp_content_object_init(article)
+        (tmp_path / name).write_text(article.content)
+        tableize.tp_content_written(str(tmp_path / name), {'article': article})
+    tableize.tp_content_written(str(tmp_path / 'small.html'), {})
+    assert sorted(path.name for path in tmp_path.iterdir()) == \
+        ['large.html', 'large.html.gz', 'small.html']
+    assert gzip.decompress((tmp_path / 'large.html.gz').read_bytes()) == \
+        (tmp_path / 'large.html').read_bytes()
+
+
+def test_precompress_removes_stale_sidecars(tmp_path, monkeypatch, caplog):
+    # sidecars of a former build, now stale
+    page = tmp_path / 'page.html'
+    for name in ('page.html', 'page.html.gz', 'page.html.br'):
+        (tmp_path / name).write_text('former')
+    pelican = make_pelican(precompress='gz,br', precompress_threshold=10000)
+    tableize.tableize_pelican_initialized_all(pelican)
+    article = make_article('<tableize>\n{0}\n</tableize>'.format(make_body(500)),
+                           settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    page.write_text(article.content)
+    monkeypatch.setitem(sys.modules, 'brotli', None)
+    with caplog.at_level('WARNING', logger=tableize.__name__):
+        tableize.tp_content_written(str(page), {'article': article})
+    assert 'brotli package is not installed; {0}.br not written'.format(page) in caplog.text
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['page.html', 'page.html.gz']
+    assert gzip.decompress((tmp_path / 'page.html.gz').read_bytes()) == page.read_bytes()
+
+    # the page now falls below the threshold, then precompression is off
+    article = make_article('<tableize>\na|b\n</tableize>', settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    tableize.tp_content_written(str(page), {'article': article})
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['page.html']
+    (tmp_path / 'page.html.gz').write_text('former')
+    pelican = make_pelican()
+    tableize.tableize_pelican_initialized_all(pelican)
+    tableize.tp_content_written(str(page), {'page': make_article('text',
+                                                                 settings=pelican.settings)})
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['page.html']
+
+
+def test_precompress_writes_sidecars_of_fragment_files(tmp_path):
+    pelican = make_pelican(fragment_threshold=1000, precompress='.gz')
+    tableize.tableize_pelican_initialized_all(pelican)
+    generator = FakeGenerator(pelican.settings)
+    generator.output_path = str(tmp_path)
+    tableize.tp_article_init(generator)
+    tableize.tp_article_preread(generator)
+    article = make_article('<tableize>\n{0}\n</tableize>'.format(make_body(5000)),
+                           settings=pelican.settings)
+    tableize.tp_content_object_init(article)
+    tableize.tp_article_write(generator, content=article)
+    fragment, = (tmp_path / 'tableize').glob('*.html')
+    assert gzip.decompress(fragment.with_name(fragment.name + '.gz').read_bytes()) == \
+        fragment.read_bytes()
+
+
+def test_handlers_connected_only_for_features_in_use():
+    from pelican import signals
+
+    def connected(signal, handler):
+        return id(tableize.tableize_timed(handler)) in signal.receivers
+
+    tableize.tableize_pelican_initialized_all(make_pelican())
+    for signal, handler in ((signals.article_generator_init, tableize.tp_article_init),
+                            (signals.article_generator_pretaxonomy,
+                             tableize.tp_article_pretaxonomy),
+                            (signals.page_generator_finalized, tableize.tp_page_finalized)):
+        assert not connected(signal, handler)
+    assert connected(signals.content_written, tableize.tp_content_written)
+
+    tableize.tableize_pelican_initialized_all(make_pelican(workers=2, precompress='gz'))
+    assert connected(signals.article_generator_pretaxonomy,
+                     tableize.tp_article_pretaxonomy)
+    assert connected(signals.page_generator_finalized, tableize.tp_page_finalized)
+    assert connected(signals.content_written, tableize.tp_content_written)
+    assert not connected(signals.article_generator_write_article,
+                         tableize.tp_article_write)
+    assert connected(signals.all_generators_finalized,
+                     tableize.tp_all_generators_finalized)
+
+    tableize.tableize_pelican_initialized_all(make_pelican(fragment_threshold=1000))
+    assert connected(signals.page_generator_write_page, tableize.tp_page_write)
+    assert connected(signals.page_generator_init, tableize.tp_page_init)
+
+    # and disconnected again by the next build without those features
+    tableize.tableize_pelican_initialized_all(make_pelican())
+    assert not connected(signals.page_generator_write_page, tableize.tp_page_write)
+
+
+def test_plugin_import_time(tmp_path):
+    # the plugin's own share of `pelican` start-up, with Pelican itself (and
+    # the Markdown and Jinja2 it imports) already loaded
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=str(tmp_path))
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))))
+    command = [sys.executable, '-X', 'importtime', '-c',
+               'import pelican; import pelican.plugins.tableize']
+    # the first run compiles the bytecode the second one measures
+    subprocess.run(command, cwd=root, env=env, check=True, capture_output=True)
+    result = subprocess.run(command, cwd=root, env=env, check=True,
+                            capture_output=True, text=True)
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == 'pelican':
+            imported.clear()  # all of Pelican's own imports
+        imported[name.strip()] = int(cumulative)
+    assert imported['pelican.plugins.tableize'] < 30000  # microseconds
+    for name in ('concurrent.futures.process', 'concurrent.futures.thread',
+                 'gzip', 'mmap', 'pprint'):
+        assert name not in imported
+
+
+def test_profile_written_at_end_of_build(tmp_path):
+    import pstats
+    profile = tmp_path / 'tableize-profile'
+    pelican = make_pelican(profile=str(profile), profile_allocations=5)
+    tableize.tableize_pelican_initialized_all(pelican)
+    assert tracemalloc.is_tracing()
+    content_object_init = tableize.tableize_timed(tableize.tp_content_object_init)
+    for name, rows in (('small.md', 2), ('large.md', 2000)):
+        content_object_init(make_article(
+            '<tableize>\n' + make_body(rows) + '</tableize>',
+            settings=pelican.settings, source_path=str(tmp_path / name)))
+    tableize.tableize_timed(tableize.tableize_pelican_finalized)(pelican)
+    assert tableize.tp_profile is None
+    assert not tracemalloc.is_tracing()
+
+    stats = pstats.Stats(str(profile) + '.pstats')
+    assert any(function == 'tableize_render_span' for _, _, function in stats.stats)
+    report = (tmp_path / 'tableize-profile.txt').read_text()
+    sources = [line.split()[-1] for line in report.splitlines() if line.endswith('.md')]
+    assert sources == [str(tmp_path / 'large.md'), str(tmp_path / 'small.md')]
+    assert 'allocations:' in report
+
+
+# A Pelican build with the plugin, in a process of its own: its signal
+# handlers stay out of this one, and its peak RSS is the build's alone
+SITE_BUILD = '''
+import json, sys, time
+from pelican import Pelican
+from pelican.plugins import tableize
+from pelican.settings import read_settings
+settings = read_settings(override=json.loads(sys.argv[1]))
+settings['PLUGINS'] = [tableize]
+start = time.perf_counter()
+Pelican(settings).run()
+try:
+    import resource
+    max_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    max_rss_kib = None
+print(json.dumps({'seconds': time.perf_counter() - start, 'max_rss_kib': max_rss_kib}))
+'''
+
+
+def build_site(content_path, output_path, **settings):
+    """ Build the site of `content_path` into `output_path` with Pelican
+        and the plugin; return the build's seconds and peak RSS. """
+    settings = dict({
+        'PATH': str(content_path),
+        'OUTPUT_PATH': str(output_path),
+        'SITEURL': 'https://example.com',
+        'TIMEZONE': 'UTC',
+        'FEED_ALL_ATOM': None,
+        'CATEGORY_FEED_ATOM': None,
+    }, **settings)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))))
+    result = subprocess.run([sys.executable, '-c', SITE_BUILD, json.dumps(settings)],
+                            cwd=root, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_table_source_files_read_again_under_reader_cache(tmp_path):
+    # Pelican's default CONTENT_CACHING_LAYER keeps what readers return,
+    # which for a .tbl file is its rendered table
+    content_path = tmp_path / 'content'
+    content_path.mkdir()
+    (content_path / 'numbers.tbl').write_text('Title: Numbers\nDate: 2024-01-01\n\n'
+                                              'a|b\n1|2\n')
+    (content_path / 'post.md').write_text('Title: Post\nDate: 2024-01-01\n\n'
+                                          '<tableize>\nc|d\n</tableize>\n')
+    cached = {'CACHE_PATH': str(tmp_path / 'cache'), 'CACHE_CONTENT': True,
+              'LOAD_CONTENT_CACHE': True, 'CONTENT_CACHING_LAYER': 'reader'}
+    build_site(content_path, tmp_path / 'output', **cached)
+    assert '<td class="tableize">1</td>' in (tmp_path / 'output' / 'numbers.html').read_text()
+
+    template = ('<table class="custom">{% for body in bodies %}<tr>'
+                '{% for entry in body %}<td>{{ entry }}</td>{% endfor %}'
+                '</tr>{% endfor %}</table>')
+    build_site(content_path, tmp_path / 'output', **cached, **{
+        tableize.PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME: {'template': template}})
+    for name, cell in (('numbers.html', '<td>1</td>'), ('post.html', '<td>c</td>')):
+        html = (tmp_path / 'output' / name).read_text()
+        assert '<table class="custom">' in html and cell in html
+        assert 'class="tableize"' not in html
+
+
+@pytest.mark.stress
+def test_stress_large_site_memory_and_throughput(tmp_path):
+    # 10k articles holding 1M table rows in all, built by Pelican with the
+    # handlers register() connects: the whole build must stay under a
+    # peak-RSS ceiling and above a rows-per-second floor, both about 1.25x
+    # off the ~450 MiB and ~15k rows/s measured when the plugin keeps no
+    # more than the current article's tables; slower runners can override
+    # them
+    pytest.importorskip('resource')
+    articles, rows_per_article = 10000, 100
+    max_rss_mib = float(os.environ.get('TABLEIZE_STRESS_MAX_RSS_MIB', '560'))
+    min_rows_per_second = float(os.environ.get('TABLEIZE_STRESS_MIN_ROWS_PER_SECOND',
+                                               '12000'))
+    content_path = tmp_path / 'content'
+    content_path.mkdir()
+    row = 'alpha|beta|{0}|gamma delta'
+    for number in range(articles):
+        (content_path / ('article-%05d.md' % number)).write_text(
+            'Title: Article {0}\nDate: 2024-01-01\nCategory: stress\n\n'
+            'Text before.\n\n<tableize th="1" ai="1">\n{1}\n</tableize>\n\n'
+            'Text after.\n'.format(number, '\n'.join(
+                row.format(number * rows_per_article + line)
+                for line in range(rows_per_article))),
+            encoding='utf-8')
+    stats_file = tmp_path / 'stats.json'
+    build = build_site(content_path, tmp_path / 'output', CACHE_CONTENT=False, **{
+        tableize.PELICAN_CONFIG_PLUGIN_TABLEIZE_ITEM_NAME: {'stats_file': str(stats_file)}})
+    stats = json.loads(stats_file.read_text())
+    assert stats['rows'] == articles * rows_per_article
+    rss_mib = build['max_rss_kib'] / 1024
+    assert rss_mib < max_rss_mib, '%.0f MiB peak RSS' % rss_mib
+    rows_per_second = stats['rows'] / build['seconds']
+    assert rows_per_second > min_rows_per_second, '%.0f rows/s' % rows_per_second
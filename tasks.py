@@ -26,10 +26,29 @@ PTY = os.name != "nt"
 
 
 @task
-def tests(c, deprecations=False):
-    """Run the test suite, optionally with `--deprecations`."""
+def tests(c, deprecations=False, stress=False):
+    """Run the test suite, optionally with `--deprecations` or `--stress`."""
     deprecations_flag = "" if deprecations else "-W ignore::DeprecationWarning"
-    c.run(f"{CMD_PREFIX}pytest {deprecations_flag}", pty=PTY)
+    stress_flag = "--stress" if stress else ""
+    c.run(f"{CMD_PREFIX}pytest {deprecations_flag} {stress_flag}", pty=PTY)
+
+
+@task
+def bench(c, corpus=None, json=None, compare=False):
+    """Run the benchmarks, optionally on an extra `--corpus` NxMxRxC.
+
+    Results are saved under `.benchmarks/` for later runs to `--compare`
+    against, and also written to `--json` when given.
+    """
+    env = {"TABLEIZE_BENCH_CORPUS": corpus} if corpus else {}
+    json_flag = f"--benchmark-json={json}" if json else ""
+    compare_flag = "--benchmark-compare" if compare else ""
+    c.run(
+        f"{CMD_PREFIX}pytest {PKG_PATH}/bench_{PKG_NAME}.py --benchmark-autosave "
+        f"{json_flag} {compare_flag}",
+        env=env,
+        pty=PTY,
+    )
 
 
 @task